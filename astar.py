@@ -0,0 +1,118 @@
+# A* and weighted A* on top of the UCS engine in ucs.py.
+#
+# The heuristics are exact move counts on an empty grid for the two movement
+# models, scaled by the cheapest step cost, so they never overestimate and are
+# consistent.  With weight > 1 the search expands fewer cells and returns a
+# path costing at most weight times the optimum.
+from itertools import compress
+
+from grid_graph import Grid, MOVES_6, MOVES_8
+from search_trace import SearchTrace, stream_search
+from ucs import terrain_costs, ucs_search
+
+
+def octile_distance(dr, dc, straight=1, diagonal=1):
+    # Cheapest cost over the 8-neighbour moves; with the project's unit
+    # diagonal cost this reduces to the Chebyshev distance
+    dr, dc = abs(dr), abs(dc)
+    return straight * (dr + dc) + (diagonal - 2 * straight) * min(dr, dc)
+
+
+def hex_distance(dr, dc):
+    # Move count for MOVES_6, whose only diagonals are (1, 1) and (-1, -1):
+    # displacements with matching signs can use them, the others cannot
+    if (dr >= 0) == (dc >= 0):
+        return max(abs(dr), abs(dc))
+    return abs(dr) + abs(dc)
+
+
+DISTANCES = {MOVES_6: hex_distance, MOVES_8: octile_distance}
+# Maps a cell byte to 1 for free cells and 0 for walls
+FREE_CELLS = bytes([1]) + bytes(255)
+
+
+def grid_heuristic(grid, target, moves=MOVES_8, min_cost=1):
+    # Lower bound on the cost from a cell id to target, given that every move
+    # costs at least min_cost
+    distance = DISTANCES[moves]
+    cols = grid.cols
+    target_r, target_c = target
+
+    def heuristic(node):
+        r, c = divmod(node, cols)
+        return min_cost * distance(target_r - r, target_c - c)
+
+    return heuristic
+
+
+def cheapest_step(grid, costs=None):
+    # Cheapest cost of stepping onto a free cell
+    if costs is None:
+        return 1
+    step_costs = terrain_costs(grid, costs)
+    return min(compress(step_costs, bytes(grid.cells).translate(FREE_CELLS)), default=1)
+
+
+def astar_search(grid, start, target, trace=None, costs=None, moves=MOVES_8,
+                 weight=1, queue='auto', min_cost=None):
+    # min_cost defaults to cheapest_step(grid, costs), a pass over every cell;
+    # compute it once and pass it in when running many queries on the same
+    # costs, ideally given as a flat array so they are not flattened again
+    grid = Grid.coerce(grid)
+    step_costs = terrain_costs(grid, costs)
+    if min_cost is None:
+        min_cost = cheapest_step(grid, step_costs)
+    heuristic = grid_heuristic(grid, target, moves, min_cost)
+    if queue == 'auto':
+        # The grid heuristic is consistent, and integral with integer costs
+        integral = step_costs.typecode == 'i' and isinstance(min_cost, int)
+        queue = 'bucket' if integral and weight == 1 else 'heap'
+    return ucs_search(grid, start, target, trace, step_costs, queue, moves, heuristic, weight)
+
+
+def astar_visualized(grid, start, target, costs=None, moves=MOVES_8, weight=1):
+    trace = SearchTrace()
+    astar_search(grid, start, target, trace, costs, moves, weight)
+    return trace
+
+
+def visualize_astar(grid, start, target, costs=None, moves=MOVES_8, weight=1, out=None,
+                    frames=None):
+    from ucs import animate_ucs_trace
+
+    trace = stream_search(astar_search, grid, start, target, costs=costs, moves=moves, weight=weight)
+    name = 'A*' if weight == 1 else f'WA* (w={weight})'
+    animate_ucs_trace(grid, trace, start, target, name, out, frames)
+
+
+def compare_with_ucs(grid, start, target, costs=None, moves=MOVES_8, weight=1):
+    # Runs UCS and (weighted) A* on the same query and reports the expansions
+    # A* saved; astar_cost never exceeds weight * ucs_cost
+    from search_stats import SearchStats
+    from ucs import path_cost
+
+    grid = Grid.coerce(grid)
+    costs = terrain_costs(grid, costs)
+    ucs_counter, astar_counter = SearchStats(), SearchStats()
+    ucs_path = ucs_search(grid, start, target, ucs_counter, costs, moves=moves)
+    astar_path = astar_search(grid, start, target, astar_counter, costs, moves, weight)
+    return {
+        'ucs_expanded': ucs_counter.expanded,
+        'astar_expanded': astar_counter.expanded,
+        'saved': ucs_counter.expanded - astar_counter.expanded,
+        'ucs_cost': path_cost(grid, ucs_path, costs) if ucs_path else None,
+        'astar_cost': path_cost(grid, astar_path, costs) if astar_path else None,
+    }
+
+
+if __name__ == '__main__':
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    print(compare_with_ucs(grid, (0, 0), (4, 4)))
+    visualize_astar(grid, (0, 0), (4, 4))
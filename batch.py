@@ -0,0 +1,82 @@
+# Answers many (start, target) queries on one map with a process pool.
+#
+# The wall buffer is copied once into shared memory and every worker attaches
+# to it when it starts, so tasks only carry the query pairs.  Workers run the
+# headless searches (no trace is recorded) and send each path back as an
+# array('i') of flat cell ids; grid.cell(idx) turns an id back into (row, col).
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+from grid_graph import Grid
+from pathfinder import SEARCHES
+
+# Per-process state set up by _attach
+_worker = {}
+
+
+def _attach(shm_name, rows, cols, algorithm, options):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # Keep the handle alive for as long as the worker uses its buffer
+    _worker['shm'] = shm
+    _worker['grid'] = Grid(rows, cols, shm.buf[:rows * cols])
+    _worker['search'] = SEARCHES[algorithm]
+    _worker['options'] = options
+
+
+def _solve_chunk(first, pairs):
+    grid, search, options = _worker['grid'], _worker['search'], _worker['options']
+    cols = grid.cols
+    results = []
+    for start, target in pairs:
+        path = search(grid, start, target, **options)
+        results.append(array('i', [r * cols + c for r, c in path]))
+    return first, results
+
+
+def solve_many(grid, pairs, algorithm='bfs', max_workers=None, chunksize=None, **options):
+    # Yields (query index, path) as results arrive, not in query order; an
+    # empty array means no path.  options are passed to the search as in
+    # find_path and must be picklable, e.g. costs= for 'ucs'.  The algorithm
+    # and options are checked here, so mistakes raise at the call rather than
+    # at the first next().
+    import inspect
+
+    if algorithm not in SEARCHES:
+        raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {sorted(SEARCHES)}")
+    try:
+        inspect.signature(SEARCHES[algorithm]).bind(None, None, None, **options)
+    except TypeError as error:
+        raise TypeError(f"Bad options for {algorithm!r}: {error}") from None
+    return _solve_many(Grid.coerce(grid), list(pairs), algorithm, max_workers, chunksize, options)
+
+
+def _solve_many(grid, pairs, algorithm, max_workers, chunksize, options):
+    if not pairs:
+        return
+
+    workers = max_workers or os.cpu_count() or 1
+    if chunksize is None:
+        # A few chunks per worker keeps them busy without one task per query
+        chunksize = max(1, min(256, len(pairs) // (workers * 4)))
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(grid)))
+    pool = None
+    try:
+        shm.buf[:len(grid)] = grid.cells
+        pool = ProcessPoolExecutor(workers, initializer=_attach,
+                                   initargs=(shm.name, grid.rows, grid.cols, algorithm, options))
+        futures = [pool.submit(_solve_chunk, first, pairs[first:first + chunksize])
+                   for first in range(0, len(pairs), chunksize)]
+        for future in as_completed(futures):
+            first, results = future.result()
+            for offset, path in enumerate(results):
+                yield first + offset, path
+    finally:
+        # Closing the generator early drops the chunks not started yet and
+        # returns without waiting for the ones still running
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        shm.close()
+        shm.unlink()
@@ -1,171 +1,155 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.animation import FuncAnimation
-from collections import deque
-
-def bidirectional_visualized(grid, start, goal):
-    rows, cols = len(grid), len(grid[0])
-    
-    # Forward search
-    q_f = deque([start])
-    visited_f = {start: None} 
-    
-    # Backward search
-    q_b = deque([goal])
-    visited_b = {goal: None} 
-    
-    states = []
-    directions = [
-    (-1, 0),   
-    (0, 1),    
-    (1, 0),    
-    (1, 1),    
-    (0, -1),   
-    (-1, -1)   
-]
-
-    intersect_node = None
+from array import array
+from grid_graph import Grid, MOVES_6, reversed_moves
+from search_trace import SearchTrace, stream_search
+
+def _expand_level(grid, frontier, table, dist, parent, other_dist, trace, layer, current_key):
+    # Expands one whole BFS level of one side and returns the next level along
+    # with the best (length, cell) meeting found on the way, or (-1, -1)
+    cells = grid.cells
+    offsets, targets = table
+    best, meet = -1, -1
+    next_frontier = []
+    for node in frontier:
+        depth = dist[node] + 1
+        for k in range(offsets[node], offsets[node + 1]):
+            nxt = targets[k]
+            if not cells[nxt] and dist[nxt] < 0:
+                dist[nxt] = depth
+                parent[nxt] = node
+                next_frontier.append(nxt)
+                if trace is not None:
+                    trace.visit(grid.cell(nxt), layer=layer)
+                if other_dist[nxt] >= 0 and (meet < 0 or depth + other_dist[nxt] < best):
+                    best, meet = depth + other_dist[nxt], nxt
+        if trace is not None:
+            trace.note(current_key, grid.cell(node))
+            if meet >= 0:
+                trace.note('intersect', grid.cell(meet))
+            trace.step()
+    return next_frontier, best, meet
+
+def bidirectional_search(grid, start, goal, trace=None, moves=MOVES_6):
+    grid = Grid.coerce(grid)
+    source, sink = grid.index(start), grid.index(goal)
+    # The backward side walks edges in reverse, so it needs the reversed moves
+    forward = grid.neighbors(moves)
+    backward = grid.neighbors(reversed_moves(moves))
+
+    # Distance from the start / to the goal, -1 = not reached yet
+    dist_f = array('i', [-1]) * len(grid)
+    parent_f = array('i', [-1]) * len(grid)
+    dist_b = array('i', [-1]) * len(grid)
+    parent_b = array('i', [-1]) * len(grid)
+    dist_f[source] = 0
+    dist_b[sink] = 0
+    frontier_f, frontier_b = [source], [sink]
+
+    if trace is not None:
+        trace.visit(start, layer='forward_visited')
+        trace.visit(goal, layer='backward_visited')
+        trace.note('current_f', None)
+        trace.note('current_b', None)
+        trace.note('intersect', None)
+
+    # Best meeting cell so far and the length of the path through it (mu)
+    best, meet = (0, source) if source == sink else (-1, -1)
     final_path = []
 
-    while q_f and q_b:
-        # --- Step Forward ---
-        curr_f = q_f.popleft()
-        for dr, dc in directions:
-            nr, nc = curr_f[0] + dr, curr_f[1] + dc
-            if (0 <= nr < rows and 0 <= nc < cols and 
-                grid[nr][nc] != 1 and (nr, nc) not in visited_f):
-                visited_f[(nr, nc)] = curr_f
-                q_f.append((nr, nc))
-                if (nr, nc) in visited_b:
-                    intersect_node = (nr, nc)
-                    break
-        if intersect_node: break
-        
-        # --- Step Backward ---
-        curr_b = q_b.popleft()
-        for dr, dc in directions:
-            nr, nc = curr_b[0] + dr, curr_b[1] + dc
-            if (0 <= nr < rows and 0 <= nc < cols and 
-                grid[nr][nc] != 1 and (nr, nc) not in visited_b):
-                visited_b[(nr, nc)] = curr_b
-                q_b.append((nr, nc))
-                if (nr, nc) in visited_f:
-                    intersect_node = (nr, nc)
-                    break
-                    
-        states.append({
-            'forward_visited': set(visited_f.keys()),
-            'backward_visited': set(visited_b.keys()),
-            'current_f': curr_f,
-            'current_b': curr_b,
-            'intersect': intersect_node,
-            'path': []
-        })
-        if intersect_node: break
+    # Every path not found yet leaves both explored balls, so it is longer than
+    # depth_f + depth_b; once mu is within that bound it is a shortest path
+    while frontier_f and frontier_b:
+        depth_f, depth_b = dist_f[frontier_f[0]], dist_b[frontier_b[0]]
+        if meet >= 0 and best <= depth_f + depth_b + 1:
+            break
+
+        # Grow whichever side has the smaller frontier, one whole level at a time
+        if len(frontier_f) <= len(frontier_b):
+            if trace is not None:
+                trace.note('current_b', None)
+            frontier_f, length, node = _expand_level(grid, frontier_f, forward, dist_f, parent_f,
+                                                     dist_b, trace, 'forward_visited', 'current_f')
+        else:
+            if trace is not None:
+                trace.note('current_f', None)
+            frontier_b, length, node = _expand_level(grid, frontier_b, backward, dist_b, parent_b,
+                                                     dist_f, trace, 'backward_visited', 'current_b')
+        if node >= 0 and (meet < 0 or length < best):
+            best, meet = length, node
 
     # --- Reconstruct Path ---
-    if intersect_node:
+    if meet >= 0:
         # Trace back to start
-        path_f = []
-        curr = intersect_node
-        while curr is not None:
-            path_f.append(curr)
-            curr = visited_f[curr]
-        path_f.reverse()
-
-        # Trace back to goal
-        path_b = []
-        curr = visited_b[intersect_node] # Start from parent of intersect in backward search
-        while curr is not None:
-            path_b.append(curr)
-            curr = visited_b[curr]
+        path_f = grid.parent_path(parent_f, meet)
+
+        # Trace back to goal, starting from the parent of the meeting cell in backward search
+        path_b = grid.parent_path(parent_b, parent_b[meet])
+        path_b.reverse()
         
         final_path = path_f + path_b
         
-        # Add final state with path
-        states.append({
-            'forward_visited': set(visited_f.keys()),
-            'backward_visited': set(visited_b.keys()),
-            'current_f': None,
-            'current_b': None,
-            'intersect': intersect_node,
-            'path': final_path
-        })
+        if trace is not None:
+            # Add final state with path
+            trace.note('current_f', None)
+            trace.note('current_b', None)
+            trace.note('intersect', grid.cell(meet))
+            trace.note('path', final_path)
+            trace.step()
             
-    return states
-
-def visualize_bidirectional(grid, start, goal):
-    states = bidirectional_visualized(grid, start, goal)
-    rows, cols = len(grid), len(grid[0])
-    
-    fig, ax = plt.subplots(figsize=(14, 8))
-    plt.subplots_adjust(right=0.7)
-
-    def draw_grid(state_idx):
-        ax.clear()
-        active_idx = min(state_idx, len(states) - 1)
-        curr_state = states[active_idx]
-        path_cells = curr_state.get('path', [])
-
-        for i in range(rows):
-            for j in range(cols):
-                if grid[i][j] == 1: color = 'black'
-                elif (i, j) == start: color = 'green'
-                elif (i, j) == goal: color = 'purple'
-                elif (i, j) in path_cells: color = 'magenta'
-                elif curr_state['intersect'] and (i, j) == curr_state['intersect']: color = 'red'
-                elif (i, j) in curr_state['forward_visited']: color = 'lightblue'
-                elif (i, j) in curr_state['backward_visited']: color = 'lightpink'
-                else: color = 'white'
-                
-                rect = patches.Rectangle((j - 0.5, i - 0.5), 1, 1,
-                                         linewidth=1, edgecolor='gray', facecolor=color)
-                ax.add_patch(rect)
-                ax.text(j, i, f'({i},{j})', ha='center', va='center', fontsize=8, color='darkgray')
+    return final_path
 
+def bidirectional_visualized(grid, start, goal, moves=MOVES_6):
+    trace = SearchTrace()
+    bidirectional_search(grid, start, goal, trace, moves)
+    return trace
+
+def visualize_bidirectional(grid, start, goal, moves=MOVES_6, out=None, frames=None):
+    trace = stream_search(bidirectional_search, grid, start, goal, moves=moves)
+    animate_bidirectional_trace(grid, trace, start, goal, out, frames)
+
+def animate_bidirectional_trace(grid, trace, start, goal, out=None, frames=None):
+    # Shared with the bidirectional UCS visualizer in ucs.py, whose traces also
+    # carry the cheapest meeting cost found so far as the 'cost' note
+    import matplotlib.pyplot as plt
+    from grid_renderer import animate_trace
+
+    # Sidebar Info
+    def status(state_idx, curr_state):
+        path_cells = curr_state.get('path')
+        cost = curr_state.get('cost')
         if path_cells:
-            py, px = zip(*path_cells)
-            ax.plot(px, py, color='white', linewidth=3, alpha=0.8)
-
-        ax.set_xticks(range(cols))
-        ax.set_yticks(range(rows))
-        ax.set_xlim(-0.5, cols - 0.5)
-        ax.set_ylim(-0.5, rows - 0.5)
-        ax.invert_yaxis()
-        ax.set_aspect('equal')
-        
-        # Sidebar Info
-        if path_cells:
-            status_text = f"--- PATH FOUND ---\n\nIntersected at: {curr_state['intersect']}\nPath Length: {len(path_cells)}"
-        elif state_idx < len(states):
-            status_text = (f"--- SEARCHING ---\n\nStep: {state_idx + 1}\n\n"
-                           f"Forward: {curr_state['current_f']}\n"
-                           f"Backward: {curr_state['current_b']}")
-        else:
-            status_text = "--- COMPLETE ---"
+            text = f"--- PATH FOUND ---\n\nIntersected at: {curr_state['intersect']}\nPath Length: {len(path_cells)}"
+            return text if cost is None else f"{text}\nTotal Cost: {cost}"
+        elif state_idx < len(trace):
+            text = (f"--- SEARCHING ---\n\nStep: {state_idx + 1}\n\n"
+                    f"Forward: {curr_state['current_f']}\n"
+                    f"Backward: {curr_state['current_b']}")
+            return text if cost is None else f"{text}\nBest Cost: {cost}"
+        return "--- COMPLETE ---"
 
-        ax.text(cols + 0.3, rows // 2, status_text, fontsize=13, fontweight='bold', 
-                va='center', bbox=dict(facecolor='white', alpha=0.8, edgecolor='black'))
-        
-        legend_elements = [
-            patches.Patch(facecolor='green', label='Start (Forward)'),
-            patches.Patch(facecolor='purple', label='Goal (Backward)'),
-            patches.Patch(facecolor='magenta', label='Final Path'),
-            patches.Patch(facecolor='lightblue', label='Forward Visited'),
-            patches.Patch(facecolor='lightpink', label='Backward Visited'),
-            patches.Patch(facecolor='red', label='Intersection Point')
-        ]
-        ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.05, 1))
-
-    ani = FuncAnimation(fig, draw_grid, frames=len(states), interval=400, repeat=False)
-    plt.show()
-
-grid = [
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 0, 0],
-    [0, 0, 0, 0, 0],
-    [0, 0, 1, 1, 0],
-    [0, 0, 0, 0, 0]
-]
-
-visualize_bidirectional(grid, (0, 0), (4, 4))
\ No newline at end of file
+    legend_elements = [
+        ('green', 'Start (Forward)'),
+        ('purple', 'Goal (Backward)'),
+        ('magenta', 'Final Path'),
+        ('lightblue', 'Forward Visited'),
+        ('lightpink', 'Backward Visited'),
+        ('red', 'Intersection Point')
+    ]
+
+    ani = animate_trace(grid, trace, start, goal, legend_elements, status,
+                        layers=(('forward_visited', 'lightblue'),
+                                ('backward_visited', 'lightpink')),
+                        current_key='intersect', target_color='purple', interval=400,
+                        out=out, frames=frames)
+    if out is None:
+        plt.show()
+
+if __name__ == '__main__':
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    visualize_bidirectional(grid, (0, 0), (4, 4))
@@ -0,0 +1,105 @@
+# Seeded map generators for the benchmarks.
+#
+# Each family takes (size, seed) and returns (grid, start, target) on a
+# size x size Grid.  The same arguments always give the same map, so results
+# from different versions of the searches can be compared run against run.
+import random
+import sys
+
+from grid_graph import Grid
+
+
+def open_field(size, seed=0):
+    return Grid(size, size), (0, 0), (size - 1, size - 1)
+
+
+def random_obstacles(size, seed=0, density=0.3):
+    # Every cell is a wall with probability density; start and target are
+    # kept free but may end up cut off from each other
+    threshold = round(density * 256)
+    walls = bytes(1 if value < threshold else 0 for value in range(256))
+    cells = bytearray(random.Random(seed).randbytes(size * size).translate(walls))
+    grid = Grid(size, size, cells)
+    grid.set_cell(0, 0, 0)
+    grid.set_cell(size - 1, size - 1, 0)
+    return grid, (0, 0), (size - 1, size - 1)
+
+
+def maze(size, seed=0):
+    # Perfect maze carved by a randomised depth-first backtracker: rooms sit
+    # on even coordinates and every wall between two rooms is a single cell
+    rng = random.Random(seed)
+    grid = Grid(size, size, bytearray(b'\x01') * (size * size))
+    cells = grid.cells
+    rooms = (size + 1) // 2
+    visited = bytearray(rooms * rooms)
+    visited[0] = 1
+    cells[0] = 0
+    stack = [(0, 0)]
+    while stack:
+        r, c = stack[-1]
+        options = [(r + dr, c + dc) for dr, dc in ((-1, 0), (0, 1), (1, 0), (0, -1))
+                   if 0 <= r + dr < rooms and 0 <= c + dc < rooms and not visited[(r + dr) * rooms + c + dc]]
+        if not options:
+            stack.pop()
+            continue
+        nr, nc = rng.choice(options)
+        visited[nr * rooms + nc] = 1
+        cells[(r + nr) * size + c + nc] = 0
+        cells[2 * nr * size + 2 * nc] = 0
+        stack.append((nr, nc))
+    last = 2 * (rooms - 1)
+    return grid, (0, 0), (last, last)
+
+
+def rooms(size, seed=0, room=16):
+    # Square rooms of side room - 1 behind one-cell walls, with one door in
+    # every wall shared by two rooms
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    cells = grid.cells
+    for line in range(room - 1, size, room):
+        cells[line * size:(line + 1) * size] = b'\x01' * size
+        cells[line::size] = b'\x01' * size
+    for line in range(room - 1, size, room):
+        for begin in range(0, size, room):
+            end = min(begin + room - 1, size)
+            cells[line * size + rng.randrange(begin, end)] = 0
+            cells[rng.randrange(begin, end) * size + line] = 0
+    last = size - 1 if (size - 1) % room != room - 1 else size - 2
+    return grid, (0, 0), (last, last)
+
+
+def corridors(size, seed=0, width=3):
+    # One serpentine corridor: walls every width + 1 rows, each with a gap at
+    # alternating ends, so the path has to sweep the whole map
+    rng = random.Random(seed)
+    grid = Grid(size, size)
+    cells = grid.cells
+    for k, line in enumerate(range(width, size, width + 1)):
+        cells[line * size:(line + 1) * size] = b'\x01' * size
+        gap = rng.randrange(width) if k % 2 else size - 1 - rng.randrange(width)
+        cells[line * size + gap] = 0
+    # The last corridor is entered at the end its wall's gap is on, so the
+    # target sits at the other end
+    last = size - 1 if (size - 1) % (width + 1) != width else size - 2
+    return grid, (0, 0), (last, size - 1 if last // (width + 1) % 2 == 0 else 0)
+
+
+FAMILIES = {
+    'open': open_field,
+    'random': random_obstacles,
+    'maze': maze,
+    'rooms': rooms,
+    'corridors': corridors,
+}
+
+
+if __name__ == '__main__':
+    # Prints a small sample of each family
+    for name, family in FAMILIES.items():
+        grid, start, target = family(int(sys.argv[1]) if len(sys.argv) > 1 else 21)
+        print(name, start, target)
+        for r in range(grid.rows):
+            print(''.join('S' if (r, c) == start else 'T' if (r, c) == target else
+                          '#' if grid.cells[r * grid.cols + c] else '.' for c in range(grid.cols)))
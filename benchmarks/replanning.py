@@ -0,0 +1,70 @@
+# Per-update cost of D* Lite repairs against replanning from scratch with UCS.
+#
+# In the default 'ahead' scenario an agent walks along its path and finds the
+# cell a few steps in front of it blocked, the case D* Lite is designed for.
+# 'anywhere' blocks a random cell of the current path instead; blocks near the
+# target invalidate most of the backward search tree and cost more to repair.
+#
+#     python -m benchmarks.replanning --size 300 --updates 50
+import argparse
+import random
+import time
+
+from benchmarks.ucs_queues import weighted_map
+from dstar_lite import DStarLite
+from grid_graph import MOVES_6, MOVES_8
+from ucs import path_cost, ucs_search
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=300)
+    parser.add_argument('--updates', type=int, default=50)
+    parser.add_argument('--moves', choices=('6', '8'), default='8')
+    parser.add_argument('--scenario', choices=('ahead', 'anywhere'), default='ahead')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    moves = MOVES_6 if args.moves == '6' else MOVES_8
+    grid, costs = weighted_map(args.size, seed=args.seed)
+    rng = random.Random(args.seed)
+    start, target = (0, 0), (args.size - 1, args.size - 1)
+
+    began = time.perf_counter()
+    planner = DStarLite(grid, start, target, costs, moves)
+    path = planner.path()
+    print(f"initial plan: {time.perf_counter() - began:.3f}s  "
+          f"expanded {planner.expanded}  cost {path_cost(grid, path, costs)}")
+
+    repair = replan = 0
+    expanded = updates = 0
+    while updates < args.updates and len(path) > 4:
+        if args.scenario == 'ahead':
+            start = path[2]
+            planner.move_start(start)
+            blocked = path[4]
+        else:
+            blocked = path[rng.randrange(1, len(path) - 1)]
+        if blocked == target:
+            break
+
+        began = time.perf_counter()
+        planner.set_cell(blocked[0], blocked[1], 1)
+        path = planner.path()
+        repair += time.perf_counter() - began
+        expanded += planner.expanded
+
+        began = time.perf_counter()
+        fresh = ucs_search(grid, start, target, costs=costs, moves=moves)
+        replan += time.perf_counter() - began
+        assert path_cost(grid, path, costs) == path_cost(grid, fresh, costs)
+        updates += 1
+
+    print(f"{updates} updates ({args.scenario}), {expanded / max(updates, 1):.0f} cells expanded per repair")
+    print(f"D* Lite repair: {repair / max(updates, 1) * 1000:.1f} ms/update")
+    print(f"UCS replan:     {replan / max(updates, 1) * 1000:.1f} ms/update")
+    print(f"speedup: {replan / repair:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# Runs the headless searches over the generated map families and records wall
+# time, peak memory, expansions, frontier size and path length for every run.
+#
+# Each (family, size, algorithm) case runs in its own process, forked once the
+# map and its neighbour tables are built, so neither is part of a measurement.
+# The search is timed once without a trace, run again under tracemalloc for
+# its peak memory and once more through search_stats.profile_search for its
+# counters.  Each run is abandoned after --timeout seconds, keeping what the
+# earlier runs measured.
+#
+# Both depth-limited searches prune cells they have already entered, so DLS
+# can miss a path at exactly the shortest depth: it gets twice that depth as
+# its limit, and IDDFS deepens until it succeeds.
+#
+#     python -m benchmarks.suite --sizes 10 100 1000 --json before.json
+#     python -m benchmarks.suite --sizes 10 100 1000 --json after.json --compare before.json
+#     python -m benchmarks.suite --families maze --sizes 4000 --algorithms bfs bd --csv big.csv
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from benchmarks.map_families import FAMILIES
+from grid_graph import MOVES_6, MOVES_8
+from pathfinder import SEARCHES
+from search_stats import profile_search
+
+ALGORITHMS = ('bfs', 'dfs', 'ucs', 'dls', 'iddfs', 'bd')
+SIZES = (10, 100, 1000)
+# Taken from the instrumented run
+COUNTED = ('expanded', 'generated', 'duplicate_pushes', 'max_frontier')
+FIELDS = ('family', 'size', 'seed', 'algorithm', 'status', 'seconds', 'peak_bytes', *COUNTED,
+          'found', 'path_length')
+
+
+def _run_case(conn, grid, start, target, algorithm, options):
+    search = SEARCHES[algorithm]
+    began = time.perf_counter()
+    path = search(grid, start, target, **options)
+    conn.send((time.perf_counter() - began, len(path)))
+
+    tracemalloc.start()
+    search(grid, start, target, **options)
+    conn.send((tracemalloc.get_traced_memory()[1],))
+    tracemalloc.stop()
+
+    path, report = profile_search(search, grid, start, target, **options)
+    conn.send(tuple(report[key] for key in COUNTED))
+    conn.close()
+
+
+def run_case(context, grid, start, target, algorithm, options, timeout):
+    record = dict.fromkeys(FIELDS[5:])
+    record['status'] = 'ok'
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_case,
+                              args=(sender, grid, start, target, algorithm, options))
+    process.start()
+    sender.close()
+    try:
+        for fields in (('seconds', 'path_length'), ('peak_bytes',), COUNTED):
+            if not receiver.poll(timeout):
+                record['status'] = 'timeout' if process.is_alive() else 'error'
+                break
+            record.update(zip(fields, receiver.recv()))
+    except EOFError:
+        record['status'] = 'error'
+    finally:
+        process.kill()
+        process.join()
+        receiver.close()
+    if record['path_length'] is not None:
+        record['found'] = record['path_length'] > 0
+    return record
+
+
+def run_suite(families, sizes, algorithms, seed=0, timeout=60, report=print):
+    # Fork where possible so cases share the parent's map and tables
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+    results = []
+    for family in families:
+        for size in sizes:
+            grid, start, target = FAMILIES[family](size, seed)
+            grid.neighbors(MOVES_6)
+            grid.neighbors(MOVES_8)
+            shortest = SEARCHES['bfs'](grid, start, target)
+            limit = 2 * (len(shortest) - 1) if shortest else len(grid)
+            for algorithm in algorithms:
+                options = {'dls': {'limit': limit}, 'iddfs': {'max_depth': len(grid)}}.get(algorithm, {})
+                record = {'family': family, 'size': size, 'seed': seed, 'algorithm': algorithm}
+                record.update(run_case(context, grid, start, target, algorithm, options, timeout))
+                results.append(record)
+                report(_format(record))
+    return results
+
+
+def _format(record):
+    if record['seconds'] is None:
+        return f"{record['family']:>10} {record['size']:>5} {record['algorithm']:>6}  {record['status']}"
+    line = (f"{record['family']:>10} {record['size']:>5} {record['algorithm']:>6}  "
+            f"{record['seconds']:9.4f}s  path {record['path_length']:>7}")
+    if record['peak_bytes'] is not None:
+        line += f"  peak {record['peak_bytes'] / 2**20:8.2f} MiB"
+    if record['expanded'] is None:
+        return f"{line}  {record['status']}"
+    frontier = '-' if record['max_frontier'] is None else record['max_frontier']
+    return f"{line}  expanded {record['expanded']:>9}  frontier {frontier:>8}"
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'commit': commit, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline):
+    # Prints time and expansion changes for the cases both runs completed
+    before = {(r['family'], r['size'], r['seed'], r['algorithm']): r for r in baseline}
+    for record in results:
+        old = before.get((record['family'], record['size'], record['seed'], record['algorithm']))
+        if not old or old['seconds'] is None or record['seconds'] is None:
+            continue
+        ratio = record['seconds'] / old['seconds'] if old['seconds'] else float('nan')
+        expansions = ''
+        if old.get('expanded') is not None and record['expanded'] is not None:
+            expansions = f"  expansions {record['expanded'] - old['expanded']:+d}"
+        path = '' if old['path_length'] == record['path_length'] else \
+            f"  path {old['path_length']} -> {record['path_length']}"
+        print(f"{record['family']:>10} {record['size']:>5} {record['algorithm']:>6}  "
+              f"time x{ratio:.2f}{expansions}{path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--families', nargs='+', choices=sorted(FAMILIES), default=list(FAMILIES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES))
+    parser.add_argument('--algorithms', nargs='+', choices=sorted(SEARCHES), default=list(ALGORITHMS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--json')
+    parser.add_argument('--csv')
+    parser.add_argument('--compare', metavar='JSON')
+    args = parser.parse_args()
+
+    results = run_suite(args.families, args.sizes, args.algorithms, args.seed, args.timeout)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'meta': _metadata(), 'results': results}, f, indent=1)
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# Compares the bucket-queue UCS against the heap fallback on a weighted map.
+#
+#     python -m benchmarks.ucs_queues --size 1000
+import argparse
+import random
+import time
+
+from grid_graph import Grid, MOVES_8
+from ucs import path_cost, ucs_search
+
+
+def weighted_map(size, wall_density=0.2, max_cost=9, seed=0):
+    rng = random.Random(seed)
+    grid = Grid(size, size, bytearray(1 if rng.random() < wall_density else 0
+                                      for _ in range(size * size)))
+    grid.set_cell(0, 0, 0)
+    grid.set_cell(size - 1, size - 1, 0)
+    costs = [rng.randint(1, max_cost) for _ in range(size * size)]
+    return grid, costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--max-cost', type=int, default=9)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    grid, costs = weighted_map(args.size, max_cost=args.max_cost, seed=args.seed)
+    grid.neighbors(MOVES_8)  # keep table building out of the timings
+    start, target = (0, 0), (args.size - 1, args.size - 1)
+
+    timings = {}
+    for queue in ('heap', 'bucket'):
+        began = time.perf_counter()
+        path = ucs_search(grid, start, target, costs=costs, queue=queue)
+        timings[queue] = time.perf_counter() - began
+        print(f"{queue:>6}: {timings[queue]:.3f}s  path cost {path_cost(grid, path, costs)}")
+    print(f"speedup: {timings['heap'] / timings['bucket']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
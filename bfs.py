@@ -1,134 +1,180 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.animation import FuncAnimation
+from array import array
 from collections import deque
-
-def bfs_visualized(grid, start, target):
-    rows, cols = len(grid), len(grid[0])
-    visited = {start}
-    queue = deque([start])
-    parent = {start: None}  # Track where we came from
-    states = []
+from grid_graph import Grid, MOVES_6, reversed_moves
+from search_trace import SearchTrace, stream_search
+
+def bfs_search(grid, start, target, trace=None):
+    grid = Grid.coerce(grid)
+    cells = grid.cells
+    offsets, targets = grid.neighbors(MOVES_6)
+    source, goal = grid.index(start), grid.index(target)
+    visited = bytearray(len(grid))
+    parent = array('i', [-1]) * len(grid)  # Track where we came from
+    visited[source] = 1
+    queue = deque([source])
+    if trace is not None:
+        trace.visit(start)
+        trace.push(start)
     final_path = []
+    # The queue holds one level then the next, so the level ends at the
+    # last cell queued while the previous level was being expanded
+    depth, level_end = 0, source
 
     found = False
     while queue:
-        row, col = queue.popleft()
-        
-        # Capture state before exploring neighbors
-        states.append({
-            'current': (row, col),
-            'visited': visited.copy(),
-            'queue': list(queue),
-            'path': [] 
-        })
-
-        if (row, col) == target:
+        node = queue.popleft()
+        if trace is not None:
+            trace.pop(grid.cell(node))
+
+            # Capture state before exploring neighbors
+            trace.note('current', grid.cell(node))
+            trace.note('depth', depth)
+            trace.step()
+
+        if node == goal:
             found = True
             break
 
-        directions = [
-        (-1, 0),   
-        (0, 1),    
-        (1, 0),    
-        (1, 1),    
-        (0, -1),   
-        (-1, -1)   
-        ]
-
-        
-        for dr, dc in directions:
-            nr, nc = row + dr, col + dc
-            if (0 <= nr < rows and 0 <= nc < cols and 
-                (nr, nc) not in visited and grid[nr][nc] != 1):
-                visited.add((nr, nc))
-                parent[(nr, nc)] = (row, col)
-                queue.append((nr, nc))
+        for k in range(offsets[node], offsets[node + 1]):
+            nxt = targets[k]
+            if not visited[nxt] and not cells[nxt]:
+                visited[nxt] = 1
+                parent[nxt] = node
+                queue.append(nxt)
+                if trace is not None:
+                    trace.visit(grid.cell(nxt))
+                    trace.push(grid.cell(nxt))
+        if node == level_end and queue:
+            depth, level_end = depth + 1, queue[-1]
 
     # Reconstruct path if target was reached
     if found:
-        curr = target
-        while curr is not None:
-            final_path.append(curr)
-            curr = parent[curr]
-        final_path.reverse()
-        
-        # Add a final state to show the path clearly
-        states.append({
-            'current': target,
-            'visited': visited,
-            'queue': [],
-            'path': final_path
-        })
-
-    return states, final_path
-
-def visualize_bfs(grid, start, target):
-    states, final_path = bfs_visualized(grid, start, target)
-    rows, cols = len(grid), len(grid[0])
-    
-    fig, ax = plt.subplots(figsize=(10, 8))
-    plt.subplots_adjust(right=0.75)
-
-    def draw_grid(state_idx):
-        ax.clear()
-        active_idx = min(state_idx, len(states) - 1)
-        curr_state = states[active_idx]
-        path_cells = curr_state.get('path', [])
-
-        for i in range(rows):
-            for j in range(cols):
-                # Logic for coloring
-                if grid[i][j] == 1: color = 'black'
-                elif (i, j) == start: color = 'green'
-                elif (i, j) == target: color = 'orange'
-                elif (i, j) in path_cells: color = 'magenta' # Final Path color
-                elif (i, j) == curr_state['current']: color = 'red'
-                elif (i, j) in curr_state['queue']: color = 'yellow'
-                elif (i, j) in curr_state['visited']: color = 'lightblue'
-                else: color = 'white'
-                
-                rect = patches.Rectangle((j - 0.5, i - 0.5), 1, 1,
-                                         linewidth=1, edgecolor='gray', facecolor=color)
-                ax.add_patch(rect)
-
-        # Draw the path line for better visualization at the end
-        if path_cells:
-            py, px = zip(*path_cells)
-            ax.plot(px, py, color='white', linewidth=3, alpha=0.8)
-
-        ax.set_xticks(range(cols))
-        ax.set_yticks(range(rows))
-        ax.set_xlim(-0.5, cols - 0.5)
-        ax.set_ylim(-0.5, rows - 0.5)
-        ax.invert_yaxis()
-        ax.set_aspect('equal')
+        final_path = grid.parent_path(parent, goal)
         
-        if path_cells:
-            ax.set_title("Path Found!", fontsize=15, fontweight='bold')
-        else:
-            ax.set_title(f"BFS Searching... Step {state_idx}", fontsize=12)
-
-        legend_elements = [
-            patches.Patch(facecolor='green', label='Start'),
-            patches.Patch(facecolor='orange', label='Target'),
-            patches.Patch(facecolor='red', label='Current'),
-            patches.Patch(facecolor='magenta', label='Final Path'),
-            patches.Patch(facecolor='lightblue', label='Visited'),
-            patches.Patch(facecolor='black', label='Obstacle')
-        ]
-        ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.05, 1))
-
-    ani = FuncAnimation(fig, draw_grid, frames=len(states), interval=200, repeat=False)
-    plt.show()
-
-# Grid and execution
-grid = [
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 0, 0],
-    [0, 0, 0, 0, 0],
-    [0, 0, 1, 1, 0],
-    [0, 0, 0, 0, 0]
-]
-
-visualize_bfs(grid, (0, 0), (4, 4))
\ No newline at end of file
+        if trace is not None:
+            # Add a final state to show the path clearly
+            trace.clear_frontier()
+            trace.note('current', target)
+            trace.note('path', final_path)
+            trace.step()
+
+    return final_path
+
+def _bfs_tree(grid, sources, moves, goals=None, k=0, trace=None):
+    # BFS seeded with every source id at distance 0.  Returns (distance,
+    # nearest, parent) arrays over cell ids, where nearest is the index into
+    # sources of the closest source (-1 = unreachable).  With goals (a set of
+    # ids) the search stops as soon as k of them have been reached.  Wall
+    # sources are skipped and stay unreachable.
+    cells = grid.cells
+    offsets, targets = grid.neighbors(moves)
+    distance = array('i', [-1]) * len(grid)
+    nearest = array('i', [-1]) * len(grid)
+    parent = array('i', [-1]) * len(grid)
+    queue = deque()
+    for i, source in enumerate(sources):
+        if distance[source] < 0 and not cells[source]:
+            distance[source] = 0
+            nearest[source] = i
+            queue.append(source)
+            if trace is not None:
+                trace.visit(grid.cell(source))
+                trace.push(grid.cell(source))
+    if goals is not None:
+        k -= sum(1 for node in queue if node in goals)
+        if k <= 0:
+            queue.clear()
+
+    while queue:
+        node = queue.popleft()
+        if trace is not None:
+            trace.pop(grid.cell(node))
+            trace.note('current', grid.cell(node))
+            trace.step()
+
+        for j in range(offsets[node], offsets[node + 1]):
+            nxt = targets[j]
+            if distance[nxt] < 0 and not cells[nxt]:
+                distance[nxt] = distance[node] + 1
+                nearest[nxt] = nearest[node]
+                parent[nxt] = node
+                queue.append(nxt)
+                if trace is not None:
+                    trace.visit(grid.cell(nxt))
+                    trace.push(grid.cell(nxt))
+                # In BFS the first time a cell is reached is along a shortest path
+                if goals is not None and nxt in goals:
+                    k -= 1
+                    if trace is not None:
+                        trace.visit(grid.cell(nxt), layer='reached')
+                    if not k:
+                        queue.clear()
+                        break
+
+    return distance, nearest, parent
+
+def bfs_multi_target(grid, start, targets, k=None, trace=None):
+    # One expansion from start towards many targets.  Returns {target: path}
+    # for the targets reached, stopping once all of them (or the k nearest)
+    # have been found.
+    grid = Grid.coerce(grid)
+    goals = {grid.index(target) for target in targets}
+    k = len(goals) if k is None else min(k, len(goals))
+    if not k:
+        return {}
+    distance, nearest, parent = _bfs_tree(grid, [grid.index(start)], MOVES_6, goals, k, trace)
+    return {tuple(target): grid.parent_path(parent, grid.index(target))
+            for target in targets if distance[grid.index(target)] >= 0}
+
+def bfs_multi_source(grid, sources, trace=None, towards=False):
+    # Expands from all sources at once and returns (distance, nearest, parent)
+    # arrays over cell ids, -1 where a cell is unreachable; nearest indexes
+    # sources.  grid.parent_path(parent, idx) gives the path from the nearest
+    # source to cell idx.  With towards=True the search follows reversed
+    # moves, so distances are from each cell to its nearest source and
+    # parent points one step closer to it, e.g. for "nearest of these exits".
+    grid = Grid.coerce(grid)
+    moves = reversed_moves(MOVES_6) if towards else MOVES_6
+    return _bfs_tree(grid, [grid.index(source) for source in sources], moves, trace=trace)
+
+def bfs_visualized(grid, start, target):
+    trace = SearchTrace()
+    final_path = bfs_search(grid, start, target, trace)
+    return trace, final_path
+
+def visualize_bfs(grid, start, target, out=None, frames=None):
+    import matplotlib.pyplot as plt
+    from grid_renderer import animate_trace
+
+    trace = stream_search(bfs_search, grid, start, target)
+
+    def title(state_idx, curr_state):
+        if curr_state.get('path'):
+            return "Path Found!", {'fontsize': 15, 'fontweight': 'bold'}
+        return f"BFS Searching... Step {state_idx}", {'fontsize': 12, 'fontweight': 'normal'}
+
+    legend_elements = [
+        ('green', 'Start'),
+        ('orange', 'Target'),
+        ('red', 'Current'),
+        ('magenta', 'Final Path'),
+        ('lightblue', 'Visited'),
+        ('black', 'Obstacle')
+    ]
+
+    ani = animate_trace(grid, trace, start, target, legend_elements, title=title,
+                        interval=200, figsize=(10, 8), right=0.75, out=out, frames=frames)
+    if out is None:
+        plt.show()
+
+if __name__ == '__main__':
+    # Grid and execution
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    visualize_bfs(grid, (0, 0), (4, 4))
@@ -0,0 +1,218 @@
+# Connected-component labelling for rejecting unreachable queries up front.
+#
+# labels[v] names the component of free cell v (-1 for walls), using the
+# moves together with their reverses, so cells in different components can
+# never reach each other.  When the move set is symmetric (MOVES_6 and MOVES_8
+# both are) this is exact.  For a directed move set, cells in the same
+# strongly connected component are known to be reachable and anything else
+# inside one component still needs a search.
+#
+# set_cell keeps the labels current: opening a cell merges the neighbouring
+# components into the largest one, and walling one off floods from its
+# neighbours in lockstep, so only the pieces that split off are relabelled.
+from array import array
+from collections import deque
+
+from grid_graph import Grid, MOVES_6, reversed_moves
+
+
+class ComponentIndex:
+
+    def __init__(self, grid, moves=MOVES_6):
+        self.grid = Grid.coerce(grid)
+        self.moves = moves
+        self.symmetric = set(moves) == set(reversed_moves(moves))
+        self._undirected = tuple(dict.fromkeys(moves + reversed_moves(moves)))
+        self.rebuild()
+
+    def rebuild(self):
+        grid = self.grid
+        self.labels = array('i', [-1]) * len(grid)
+        self.sizes = {}
+        self._next_label = 0
+        self._strong = None
+        for v in range(len(grid)):
+            if not grid.cells[v] and self.labels[v] < 0:
+                label = self._new_label()
+                self.sizes[label] = self._relabel(v, -1, label)
+
+    def reachable(self, start, target):
+        # False when target cannot be reached from start, True when it can,
+        # and None when only a search can tell (directed move sets)
+        grid = self.grid
+        source, goal = grid.index(start), grid.index(target)
+        if source == goal:
+            return True
+        label = self.labels[source]
+        if label < 0 or label != self.labels[goal]:
+            return False
+        if self.symmetric:
+            return True
+        if self._strong is None:
+            self._strong = self._strong_labels()
+        return True if self._strong[source] == self._strong[goal] else None
+
+    def set_cell(self, r, c, value):
+        # Use this instead of grid.set_cell so the labels follow the change
+        grid = self.grid
+        idx = r * grid.cols + c
+        was_wall = grid.cells[idx] != 0
+        grid.set_cell(r, c, value)
+        if was_wall == (grid.cells[idx] != 0):
+            return
+        self._strong = None
+        if was_wall:
+            self._open(idx)
+        else:
+            self._close(idx)
+
+    def _new_label(self):
+        label = self._next_label
+        self._next_label += 1
+        return label
+
+    def _around(self, idx):
+        offsets, targets = self.grid.neighbors(self._undirected)
+        return targets[offsets[idx]:offsets[idx + 1]]
+
+    def _relabel(self, seed, old, new):
+        # Floods the cells labelled old that are connected to seed and gives
+        # them label new; returns how many cells changed
+        cells, labels = self.grid.cells, self.labels
+        offsets, targets = self.grid.neighbors(self._undirected)
+        labels[seed] = new
+        queue = deque([seed])
+        count = 1
+        while queue:
+            node = queue.popleft()
+            for k in range(offsets[node], offsets[node + 1]):
+                nxt = targets[k]
+                if labels[nxt] == old and not cells[nxt]:
+                    labels[nxt] = new
+                    queue.append(nxt)
+                    count += 1
+        return count
+
+    def _open(self, idx):
+        labels, sizes = self.labels, self.sizes
+        around = {}
+        for nxt in self._around(idx):
+            if labels[nxt] >= 0:
+                around.setdefault(labels[nxt], nxt)
+        if not around:
+            label = self._new_label()
+            labels[idx] = label
+            sizes[label] = 1
+            return
+        # Smaller components are relabelled into the largest one
+        keep = max(around, key=sizes.get)
+        labels[idx] = keep
+        sizes[keep] += 1
+        for label, seed in around.items():
+            if label != keep:
+                sizes[keep] += self._relabel(seed, label, keep)
+                del sizes[label]
+
+    def _close(self, idx):
+        labels, sizes = self.labels, self.sizes
+        old = labels[idx]
+        labels[idx] = -1
+        sizes[old] -= 1
+        seeds = list(dict.fromkeys(nxt for nxt in self._around(idx) if labels[nxt] == old))
+        if not seeds:
+            del sizes[old]
+            return
+
+        # One flood per neighbour, run round-robin.  Floods that meet are
+        # merged; one that runs dry while others are still going is a piece
+        # that split off.  The last flood left keeps the old label untouched.
+        offsets, targets = self.grid.neighbors(self._undirected)
+        owner = {seed: i for i, seed in enumerate(seeds)}
+        merged_into = list(range(len(seeds)))
+        queues = {i: deque([seed]) for i, seed in enumerate(seeds)}
+        members = {i: [seed] for i, seed in enumerate(seeds)}
+
+        def find(flood):
+            while merged_into[flood] != flood:
+                merged_into[flood] = flood = merged_into[merged_into[flood]]
+            return flood
+
+        while len(queues) > 1:
+            for flood in list(queues):
+                if flood not in queues or len(queues) == 1:
+                    continue
+                queue = queues[flood]
+                if not queue:
+                    label = self._new_label()
+                    piece = members.pop(flood)
+                    for v in piece:
+                        labels[v] = label
+                    sizes[label] = len(piece)
+                    sizes[old] -= len(piece)
+                    del queues[flood]
+                    continue
+                node = queue.popleft()
+                for k in range(offsets[node], offsets[node + 1]):
+                    nxt = targets[k]
+                    if labels[nxt] != old:
+                        continue
+                    other = owner.get(nxt)
+                    if other is None:
+                        owner[nxt] = flood
+                        queue.append(nxt)
+                        members[flood].append(nxt)
+                    else:
+                        other = find(other)
+                        if other != flood:
+                            merged_into[other] = flood
+                            queue.extend(queues.pop(other))
+                            members[flood].extend(members.pop(other))
+
+    def _strong_labels(self):
+        # Iterative Tarjan over the directed neighbour table
+        cells = self.grid.cells
+        offsets, targets = self.grid.neighbors(self.moves)
+        n = len(self.grid)
+        index = array('i', [-1]) * n
+        low = array('i', [0]) * n
+        strong = array('i', [-1]) * n
+        on_stack = bytearray(n)
+        stack = []
+        counter = 0
+        label = 0
+        for root in range(n):
+            if cells[root] or index[root] >= 0:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [(root, offsets[root])]
+            while work:
+                node, k = work[-1]
+                if k < offsets[node + 1]:
+                    work[-1] = (node, k + 1)
+                    nxt = targets[k]
+                    if cells[nxt]:
+                        continue
+                    if index[nxt] < 0:
+                        index[nxt] = low[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        on_stack[nxt] = 1
+                        work.append((nxt, offsets[nxt]))
+                    elif on_stack[nxt] and index[nxt] < low[node]:
+                        low[node] = index[nxt]
+                    continue
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    while True:
+                        v = stack.pop()
+                        on_stack[v] = 0
+                        strong[v] = label
+                        if v == node:
+                            break
+                    label += 1
+        return strong
@@ -1,200 +1,140 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.animation import FuncAnimation
-
-def dfs_visualized(grid, start, target):
-    rows, cols = len(grid), len(grid[0])
-    visited = set()
-    stack = [start]
-    parent = {start: None}
-    states = []
+from array import array
+from grid_graph import Grid, MOVES_6
+from search_trace import SearchTrace, stream_search
+
+def dfs_search(grid, start, target, trace=None):
+    grid = Grid.coerce(grid)
+    cells = grid.cells
+    # Required clockwise order: Up, Right, Bottom, Bottom-Right, Left, Top-Left
+    offsets, targets = grid.neighbors(MOVES_6)
+    source, goal = grid.index(start), grid.index(target)
+    visited = bytearray(len(grid))
+    parent = array('i', [-1]) * len(grid)
+    stack = [source]
+    if trace is not None:
+        trace.push(start)
     final_path = []
     found = False
 
     while stack:
-        row, col = stack.pop()
+        node = stack.pop()
+        if trace is not None:
+            trace.pop(grid.cell(node))
 
-        if (row, col) in visited:
+        if visited[node]:
             continue
 
-        visited.add((row, col))
+        visited[node] = 1
+        if trace is not None:
+            trace.visit(grid.cell(node))
 
-        # Save state before expanding neighbors
-        states.append({
-            'current': (row, col),
-            'visited': visited.copy(),
-            'stack': list(stack),
-            'path': []
-        })
+            # Save state before expanding neighbors
+            trace.note('current', grid.cell(node))
+            trace.step()
 
-        if (row, col) == target:
+        if node == goal:
             found = True
             break
 
-        # Required clockwise order
-        directions = [
-            (-1, 0),   # 1. Up
-            (0, 1),    # 2. Right
-            (1, 0),    # 3. Bottom
-            (1, 1),    # 4. Bottom-Right (Diagonal)
-            (0, -1),   # 5. Left
-            (-1, -1)   # 6. Top-Left (Diagonal)
-        ]
-
         # Reverse for correct DFS expansion order
-        for dr, dc in reversed(directions):
-            nr, nc = row + dr, col + dc
-            if (0 <= nr < rows and 0 <= nc < cols and
-                (nr, nc) not in visited and
-                grid[nr][nc] != 1):
+        for k in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+            nxt = targets[k]
+            if not visited[nxt] and not cells[nxt]:
 
-                if (nr, nc) not in parent:  # prevent parent overwrite
-                    parent[(nr, nc)] = (row, col)
+                if parent[nxt] < 0:  # prevent parent overwrite
+                    parent[nxt] = node
 
-                stack.append((nr, nc))
+                stack.append(nxt)
+                if trace is not None:
+                    trace.push(grid.cell(nxt))
 
     # Reconstruct path if found
     if found:
-        curr = target
-        while curr is not None:
-            final_path.append(curr)
-            curr = parent.get(curr)
-        final_path.reverse()
-
-        states.append({
-            'current': target,
-            'visited': visited,
-            'stack': [],
-            'path': final_path
-        })
-
-    return states
-
-
-def visualize_dfs(grid, start, target):
-    states = dfs_visualized(grid, start, target)
-    rows, cols = len(grid), len(grid[0])
-
-    fig, ax = plt.subplots(figsize=(14, 8))
-    plt.subplots_adjust(right=0.7)
-
-    def draw_grid(state_idx):
-        ax.clear()
-        active_idx = min(state_idx, len(states) - 1)
-        curr_state = states[active_idx]
-        path_cells = curr_state.get('path', [])
-
-        for i in range(rows):
-            for j in range(cols):
-                if grid[i][j] == 1:
-                    color = 'black'
-                elif (i, j) == start:
-                    color = 'green'
-                elif (i, j) == target:
-                    color = 'orange'
-                elif (i, j) in path_cells:
-                    color = 'magenta'
-                elif (i, j) == curr_state['current']:
-                    color = 'red'
-                elif (i, j) in curr_state['stack']:
-                    color = 'yellow'
-                elif (i, j) in curr_state['visited']:
-                    color = 'lightblue'
-                else:
-                    color = 'white'
-
-                rect = patches.Rectangle((j - 0.5, i - 0.5), 1, 1,
-                                         linewidth=1,
-                                         edgecolor='gray',
-                                         facecolor=color)
-                ax.add_patch(rect)
-
-                ax.text(j, i, f'({i},{j})',
-                        ha='center',
-                        va='center',
-                        fontsize=9,
-                        color='darkgray')
-
-        # Draw final path line
-        if path_cells:
-            py, px = zip(*path_cells)
-            ax.plot(px, py, color='white', linewidth=3, alpha=0.8)
+        final_path = grid.parent_path(parent, goal)
+
+        if trace is not None:
+            trace.clear_frontier()
+            trace.note('current', target)
+            trace.note('path', final_path)
+            trace.step()
+
+    return final_path
+
+
+def dfs_visualized(grid, start, target):
+    trace = SearchTrace()
+    dfs_search(grid, start, target, trace)
+    return trace
+
+
+def visualize_dfs(grid, start, target, out=None, frames=None):
+    import matplotlib.pyplot as plt
+    from grid_renderer import animate_trace
 
-        ax.set_xticks(range(cols))
-        ax.set_yticks(range(rows))
-        ax.set_xlim(-0.5, cols - 0.5)
-        ax.set_ylim(-0.5, rows - 0.5)
-        ax.invert_yaxis()
-        ax.set_aspect('equal')
+    trace = stream_search(dfs_search, grid, start, target)
 
-        # Sidebar text
+    def title(state_idx, curr_state):
+        if curr_state.get('path'):
+            title_color = 'magenta'
+        elif state_idx < len(trace):
+            title_color = 'black'
+        else:
+            title_color = 'red'
+        return "Depth First Search Visualization", {'fontsize': 16, 'color': title_color}
+
+    # Sidebar text
+    def status(state_idx, curr_state):
+        path_cells = curr_state.get('path')
         if path_cells:
-            status_text = (
+            return (
                 "--- DFS COMPLETE ---\n\n"
                 "PATH FOUND!\n\n"
                 f"Path Length: {len(path_cells)}"
             )
-            title_color = 'magenta'
-        elif state_idx < len(states):
+        elif state_idx < len(trace):
             curr = curr_state['current']
-            status_text = (
+            return (
                 f"--- DFS STATUS ---\n\n"
                 f"Step: {state_idx + 1}\n\n"
                 f"Exploring: ({curr[0]}, {curr[1]})\n\n"
                 f"Visited: {len(curr_state['visited'])}\n"
-                f"In Stack: {len(curr_state['stack'])}"
+                f"In Stack: {curr_state['frontier_size']}"
             )
-            title_color = 'black'
-        else:
-            status_text = "--- DFS STATUS ---\n\nCOMPLETE (No Path)"
-            title_color = 'red'
-
-        ax.text(cols * 1.1,
-                rows / 2,
-                status_text,
-                fontsize=13,
-                fontweight='bold',
-                va='center',
-                bbox=dict(facecolor='white',
-                          alpha=0.8,
-                          edgecolor='black'))
-
-        ax.set_title("Depth First Search Visualization",
-                     fontsize=16,
-                     pad=20,
-                     color=title_color)
-
-        legend_elements = [
-            patches.Patch(facecolor='green', label='Start'),
-            patches.Patch(facecolor='orange', label='Target'),
-            patches.Patch(facecolor='magenta', label='Final Path'),
-            patches.Patch(facecolor='red', label='Current'),
-            patches.Patch(facecolor='yellow', label='In Stack'),
-            patches.Patch(facecolor='lightblue', label='Visited'),
-            patches.Patch(facecolor='black', label='Obstacle')
-        ]
-
-        ax.legend(handles=legend_elements,
-                  loc='upper left',
-                  bbox_to_anchor=(1.05, 1),
-                  borderaxespad=0.)
-
-    ani = FuncAnimation(fig,
-                        draw_grid,
-                        frames=len(states),
+        return "--- DFS STATUS ---\n\nCOMPLETE (No Path)"
+
+    legend_elements = [
+        ('green', 'Start'),
+        ('orange', 'Target'),
+        ('magenta', 'Final Path'),
+        ('red', 'Current'),
+        ('yellow', 'In Stack'),
+        ('lightblue', 'Visited'),
+        ('black', 'Obstacle')
+    ]
+
+    ani = animate_trace(grid,
+                        trace,
+                        start,
+                        target,
+                        legend_elements,
+                        status,
+                        title=title,
+                        label_size=9,
                         interval=300,
-                        repeat=False)
+                        out=out, frames=frames)
 
-    plt.show()
+    if out is None:
+        plt.show()
 
 
-# Grid
-grid = [
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 0, 0],
-    [0, 0, 0, 0, 0],
-    [0, 0, 1, 1, 0],
-    [0, 0, 0, 0, 0]
-]
+if __name__ == '__main__':
+    # Grid
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
 
-visualize_dfs(grid, (0, 0), (4, 4))
+    visualize_dfs(grid, (0, 0), (4, 4))
@@ -0,0 +1,170 @@
+# Incremental replanning with D* Lite.
+#
+# The planner searches backwards from the target, so g[v] is the cost from v
+# to the target and rhs[v] the one-step lookahead over v's successors.  Both
+# are kept between calls: set_cell only re-evaluates the cells that can step
+# onto the changed one, and the next path() call repairs just the part of the
+# search tree that became inconsistent.  move_start lets the start walk along
+# the path without throwing that work away (the km offset from the paper).
+import heapq
+from array import array
+
+from astar import DISTANCES
+from grid_graph import Grid, MOVES_8, reversed_moves
+from ucs import terrain_costs
+
+INF = float('inf')
+
+
+class DStarLite:
+
+    def __init__(self, grid, start, target, costs=None, moves=MOVES_8):
+        self.grid = Grid.coerce(grid)
+        self.moves = moves
+        self.step_costs = terrain_costs(self.grid, costs)
+        # Costs never change, only walls, so the cheapest cost keeps h admissible
+        self._min_cost = min(self.step_costs) if len(self.step_costs) else 1
+        self._distance = DISTANCES[moves]
+        self._successors = self.grid.neighbors(moves)
+        self._predecessors = self.grid.neighbors(reversed_moves(moves))
+
+        n = len(self.grid)
+        self.start = self.grid.index(start)
+        self.goal = self.grid.index(target)
+        self.km = 0
+        self.g = array('d', [INF]) * n
+        self.rhs = array('d', [INF]) * n
+        # Key of each cell's live queue entry; other heap entries are stale
+        self._queued = [None] * n
+        self._queue = []
+        # Cells expanded by the last path() call
+        self.expanded = 0
+
+        self.rhs[self.goal] = 0
+        self._push(self.goal)
+
+    def set_cell(self, r, c, value):
+        # Toggles a wall; the repair happens on the next path() call
+        grid = self.grid
+        idx = r * grid.cols + c
+        was_wall = grid.cells[idx]
+        grid.set_cell(r, c, value)
+        if grid.cells[idx] == was_wall:
+            return
+        self._update(idx)
+        offsets, targets = self._predecessors
+        for k in range(offsets[idx], offsets[idx + 1]):
+            self._update(targets[k])
+
+    def move_start(self, cell):
+        start = self.grid.index(cell)
+        self.km += self._h_between(self.start, start)
+        self.start = start
+
+    def path(self, trace=None):
+        self._compute(trace)
+        grid, g, cells, costs = self.grid, self.g, self.grid.cells, self.step_costs
+        node = self.start
+        if g[node] == INF:
+            return []
+        # Walk downhill: each step goes to the successor with the cheapest cost to go
+        offsets, targets = self._successors
+        path = [grid.cell(node)]
+        while node != self.goal:
+            best, step = INF, -1
+            for k in range(offsets[node], offsets[node + 1]):
+                nxt = targets[k]
+                if not cells[nxt] and costs[nxt] + g[nxt] < best:
+                    best, step = costs[nxt] + g[nxt], nxt
+            if step < 0 or len(path) > len(grid):
+                return []
+            node = step
+            path.append(grid.cell(node))
+        return path
+
+    def _h_between(self, a, b):
+        ar, ac = divmod(a, self.grid.cols)
+        br, bc = divmod(b, self.grid.cols)
+        return self._min_cost * self._distance(br - ar, bc - ac)
+
+    def _key(self, node):
+        m = min(self.g[node], self.rhs[node])
+        return m + self._h_between(self.start, node) + self.km, m
+
+    def _push(self, node):
+        key = self._key(node)
+        self._queued[node] = key
+        heapq.heappush(self._queue, (key, node))
+
+    def _update(self, node):
+        g, rhs = self.g, self.rhs
+        if self.grid.cells[node]:
+            # Nothing can step onto a wall, so its values no longer matter
+            g[node] = rhs[node] = INF
+            self._queued[node] = None
+            return
+        if node != self.goal:
+            cells, costs = self.grid.cells, self.step_costs
+            offsets, targets = self._successors
+            best = INF
+            for k in range(offsets[node], offsets[node + 1]):
+                nxt = targets[k]
+                if not cells[nxt] and costs[nxt] + g[nxt] < best:
+                    best = costs[nxt] + g[nxt]
+            rhs[node] = best
+        if g[node] != rhs[node]:
+            self._push(node)
+        else:
+            self._queued[node] = None
+
+    def _compute(self, trace):
+        g, rhs, queue, queued = self.g, self.rhs, self._queue, self._queued
+        cells, costs = self.grid.cells, self.step_costs
+        offsets, targets = self._predecessors
+        start, goal = self.start, self.goal
+        self.expanded = 0
+        while queue:
+            key, node = queue[0]
+            if queued[node] != key:
+                heapq.heappop(queue)
+                continue
+            if key >= self._key(start) and rhs[start] == g[start]:
+                break
+            heapq.heappop(queue)
+            new_key = self._key(node)
+            if key < new_key:
+                queued[node] = new_key
+                heapq.heappush(queue, (new_key, node))
+                continue
+
+            queued[node] = None
+            self.expanded += 1
+            enter = costs[node] if not cells[node] else INF
+            if g[node] > rhs[node]:
+                # Overconsistent: g drops to rhs, which can only lower the
+                # lookahead of the cells that step onto node
+                g[node] = rhs[node]
+                through = enter + g[node]
+                for k in range(offsets[node], offsets[node + 1]):
+                    pred = targets[k]
+                    if through < rhs[pred] and pred != goal and not cells[pred]:
+                        rhs[pred] = through
+                        if g[pred] != through:
+                            self._push(pred)
+                        else:
+                            queued[pred] = None
+            else:
+                # Underconsistent: only cells whose lookahead went through node
+                # need their rhs recomputed
+                through = enter + g[node]
+                g[node] = INF
+                self._update(node)
+                for k in range(offsets[node], offsets[node + 1]):
+                    pred = targets[k]
+                    if rhs[pred] == through:
+                        self._update(pred)
+
+            if trace is not None:
+                trace.visit(self.grid.cell(node), g[node])
+                trace.note('current', self.grid.cell(node))
+                trace.step()
@@ -0,0 +1,59 @@
+# Playback policies that decide which trace steps become animation frames.
+#
+# A policy is called as policy(trace, interval) on a finished trace and
+# returns the sorted step indices to show; pass it as animate_trace(frames=...)
+# or to any visualize_* function.  Skipped steps are not lost: the cursor
+# replays their events on the way to the next shown step, so every frame still
+# shows the whole search up to that point.
+#
+# Every policy keeps the milestones: the first and last steps, the first step
+# that shows the path, and both sides of every change of the 'limit' note
+# (IDDFS starting a new iteration).
+
+
+def milestones(trace):
+    if not len(trace):
+        return set()
+    steps = {0, len(trace) - 1}
+    for step_idx, path in trace.note_steps('path'):
+        if path:
+            steps.add(step_idx)
+            break
+    for step_idx, _ in trace.note_steps('limit'):
+        steps.update((max(step_idx - 1, 0), step_idx))
+    return steps
+
+
+def by_count(count):
+    # About count frames spread evenly over the search, plus the milestones
+    def policy(trace, interval):
+        last = len(trace) - 1
+        if count >= len(trace):
+            return list(range(len(trace)))
+        spaced = {round(k * last / max(count - 1, 1)) for k in range(count)}
+        return sorted(spaced | milestones(trace))
+
+    return policy
+
+
+def by_duration(seconds):
+    # As many evenly spread frames as fit in seconds of playback
+    def policy(trace, interval):
+        return by_count(max(2, int(seconds * 1000 / interval)))(trace, interval)
+
+    return policy
+
+
+def by_level(key='depth'):
+    # One frame per value of a note, showing the last step with that value:
+    # 'depth' gives one frame per BFS level, 'cost' one per UCS cost and
+    # 'limit' one per IDDFS iteration
+    def policy(trace, interval):
+        steps = milestones(trace)
+        changes = trace.note_steps(key)
+        for (step_idx, value), (next_idx, next_value) in zip(changes, changes[1:]):
+            if next_value != value:
+                steps.add(next_idx - 1)
+        return sorted(steps)
+
+    return policy
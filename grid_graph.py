@@ -0,0 +1,83 @@
+from array import array
+
+# Movement models, in the order the algorithms expand neighbours.
+# Up, Right, Bottom, Bottom-Right, Left, Top-Left (BFS, DFS, DLS, IDDFS, BD)
+MOVES_6 = ((-1, 0), (0, 1), (1, 0), (1, 1), (0, -1), (-1, -1))
+# Up, Right, Down, Left, and 4 diagonals (UCS)
+MOVES_8 = ((-1, 0), (0, 1), (1, 0), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1))
+
+
+def reversed_moves(moves):
+    # The moves that lead back to a cell, for searching edges backwards
+    return tuple((-dr, -dc) for dr, dc in moves)
+
+
+class Grid:
+    # A rows x cols map stored as one flat buffer, where cell (r, c) has the
+    # integer id r * cols + c and a nonzero byte marks a wall.
+
+    def __init__(self, rows, cols, cells=None):
+        self.rows = rows
+        self.cols = cols
+        self.cells = cells if cells is not None else bytearray(rows * cols)
+        self._tables = {}
+
+    @classmethod
+    def from_rows(cls, grid):
+        rows, cols = len(grid), len(grid[0])
+        cells = bytearray(1 if value else 0 for row in grid for value in row)
+        return cls(rows, cols, cells)
+
+    @classmethod
+    def coerce(cls, grid):
+        # Lets every search accept either a Grid or the list-of-lists demo grids
+        return grid if isinstance(grid, cls) else cls.from_rows(grid)
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def index(self, cell):
+        return cell[0] * self.cols + cell[1]
+
+    def cell(self, idx):
+        return divmod(idx, self.cols)
+
+    def is_wall(self, cell):
+        return self.cells[self.index(cell)] != 0
+
+    def set_cell(self, r, c, value):
+        # Neighbour tables only encode the grid bounds, so they stay valid
+        self.cells[r * self.cols + c] = 1 if value else 0
+
+    def neighbors(self, moves=MOVES_6):
+        # CSR neighbour table for a movement model: the in-bounds neighbours of
+        # id v are targets[offsets[v]:offsets[v + 1]], in the order of moves.
+        # Walls are left in and checked by the searches against self.cells.
+        table = self._tables.get(moves)
+        if table is None:
+            table = self._tables[moves] = self._build_table(moves)
+        return table
+
+    def _build_table(self, moves):
+        rows, cols = self.rows, self.cols
+        offsets = array('i', [0])
+        targets = array('i')
+        for r in range(rows):
+            row_moves = [(dr * cols + dc, dc) for dr, dc in moves if 0 <= r + dr < rows]
+            base = r * cols
+            for c in range(cols):
+                v = base + c
+                targets.extend([v + delta for delta, dc in row_moves if 0 <= c + dc < cols])
+                offsets.append(len(targets))
+        return offsets, targets
+
+    def parent_path(self, parent, target):
+        # Follows a parent array (-1 = no parent) back from target and returns
+        # the path as (row, col) tuples, start first
+        path = []
+        curr = target
+        while curr >= 0:
+            path.append(divmod(curr, self.cols))
+            curr = parent[curr]
+        path.reverse()
+        return path
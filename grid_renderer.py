@@ -0,0 +1,179 @@
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.patches as patches
+from matplotlib.animation import FuncAnimation
+from matplotlib.colors import ListedColormap
+from frame_export import agg_figure, export_frames
+from grid_graph import Grid
+from search_trace import StreamingTrace
+
+# Cell codes stored in the uint8 image, in drawing precedence order.
+# Codes from LAYER upwards belong to the trace layers passed to animate_trace.
+EMPTY, WALL, START, TARGET, PATH, CURRENT, FRONTIER, LAYER = range(8)
+
+# Grids above these sizes skip per-cell labels and cell borders
+MAX_LABELLED_CELLS = 400
+MAX_BORDERED_SIDE = 60
+
+
+def animate_trace(grid, trace, start, target, legend, status=None, title=None,
+                  layers=(('visited', 'lightblue'),), current_key='current',
+                  target_color='orange', cell_label=None, label_size=8,
+                  interval=200, figsize=(14, 8), right=0.7, out=None, max_workers=None,
+                  frames=None):
+    # Plays a SearchTrace on a single imshow image.  Every frame only
+    # recolours the cells the trace touched since the previous frame; the
+    # title, sidebar, legend and labels are created once and updated in place.
+    # A StreamingTrace is played as its search records it, and closing the
+    # window cancels the search.  With out set, the frames are instead
+    # rendered headlessly into that video or GIF file and None is returned.
+    # frames picks the steps to show, as a list of step indices or a policy
+    # from frame_policy; policies need the whole trace, so they wait for a
+    # streaming search to finish.
+    grid = Grid.coerce(grid)
+    rows, cols = grid.rows, grid.cols
+    layer_names = [name for name, _ in layers]
+    colors = ['white', 'black', 'green', target_color, 'magenta', 'red', 'yellow']
+    colors += [color for _, color in layers]
+    cursor = trace.cursor()
+
+    static = np.zeros((rows, cols), dtype=np.uint8)
+    static[np.frombuffer(grid.cells, dtype=np.uint8).reshape(rows, cols) != 0] = WALL
+    static[start] = START
+    static[target] = TARGET
+    cells = static.copy()
+
+    fig = agg_figure(figsize) if out else plt.figure(figsize=figsize)
+    ax = fig.add_axes([0.08, 0.08, right - 0.1, 0.8])
+    title_ax = fig.add_axes([0.08, 0.9, right - 0.1, 0.08])
+    side_ax = fig.add_axes([right + 0.02, 0.08, 0.96 - right, 0.88])
+    title_ax.axis('off')
+    side_ax.axis('off')
+
+    image = ax.imshow(cells, cmap=ListedColormap(colors), vmin=0,
+                      vmax=len(colors) - 1, interpolation='nearest')
+    # Cell borders are line artists rather than axis gridlines, so they can
+    # be blitted on top of the image along with the axes frame
+    borders = list(ax.spines.values())
+    if max(rows, cols) <= MAX_BORDERED_SIDE:
+        ax.set_xticks(range(cols))
+        ax.set_yticks(range(rows))
+        borders.append(ax.hlines(np.arange(-0.5, rows), -0.5, cols - 0.5, color='gray', linewidth=1))
+        borders.append(ax.vlines(np.arange(-0.5, cols), -0.5, rows - 0.5, color='gray', linewidth=1))
+
+    path_line, = ax.plot([], [], color='white', linewidth=3, alpha=0.8)
+    title_text = title_ax.text(0.5, 0.5, '', ha='center', va='center', fontsize=12)
+    side_ax.legend(handles=[patches.Patch(facecolor=color, label=label)
+                            for color, label in legend],
+                   loc='upper left', borderaxespad=0.)
+    artists = [image, *borders, path_line, title_text]
+    if status:
+        sidebar = side_ax.text(0, 0.3, '', fontsize=13, fontweight='bold', va='center',
+                               bbox=dict(facecolor='white', alpha=0.8, edgecolor='black'))
+        artists.append(sidebar)
+
+    labels = {}
+    if rows * cols <= MAX_LABELLED_CELLS:
+        for i in range(rows):
+            for j in range(cols):
+                labels[(i, j)] = ax.text(j, i, f'({i},{j})', ha='center', va='center',
+                                         fontsize=label_size, color='darkgray')
+    # Blitting redraws the image over the static background, so the labels
+    # have to be redrawn after it every frame to stay visible
+    artists.extend(labels.values())
+
+    drawn = {'path': None, 'current': None}
+
+    def cell_code(cell, state, path_cells):
+        code = static[cell]
+        if code:
+            return code
+        if cell in path_cells:
+            return PATH
+        if cell == state.get(current_key):
+            return CURRENT
+        if cell in state['frontier']:
+            return FRONTIER
+        for k, name in enumerate(layer_names):
+            layer = state.get(name)
+            if layer and cell in layer:
+                return LAYER + k
+        return EMPTY
+
+    def redraw_all(state, path_cells):
+        dynamic = np.zeros_like(cells)
+        for k in reversed(range(len(layer_names))):
+            for cell in state.get(layer_names[k], ()):
+                dynamic[cell] = LAYER + k
+        for cell in state['frontier']:
+            dynamic[cell] = FRONTIER
+        if state.get(current_key) is not None:
+            dynamic[state[current_key]] = CURRENT
+        for cell in path_cells:
+            dynamic[cell] = PATH
+        np.copyto(cells, np.where(static > 0, static, dynamic))
+        return labels.keys()
+
+    def draw_frame(state_idx):
+        active_idx = min(state_idx, len(trace) - 1)
+        state = cursor.seek(active_idx)
+        path = state.get('path') or ()
+        path_cells = set(path)
+        current = state.get(current_key)
+
+        if cursor.touched is None:
+            changed = redraw_all(state, path_cells)
+        else:
+            changed = cursor.touched
+            if current != drawn['current']:
+                changed.update(c for c in (current, drawn['current']) if c is not None)
+            if path is not drawn['path']:
+                changed.update(path_cells)
+                changed.update(drawn['path'] or ())
+            for cell in changed:
+                cells[cell] = cell_code(cell, state, path_cells)
+
+        if path is not drawn['path']:
+            if path:
+                py, px = zip(*path)
+                path_line.set_data(px, py)
+            else:
+                path_line.set_data([], [])
+        drawn['path'] = path
+        drawn['current'] = current
+        image.set_data(cells)
+
+        if cell_label:
+            for cell in changed:
+                if cell in labels:
+                    labels[cell].set_text(cell_label(cell, state))
+
+        if title:
+            text, props = title(state_idx, state)
+            title_text.set_text(text)
+            title_text.update(props)
+        if status:
+            sidebar.set_text(status(state_idx, state))
+        return artists
+
+    def init():
+        cursor.position = -1
+        drawn['path'] = drawn['current'] = None
+        return artists
+
+    if callable(frames) or (out and frames is None):
+        if isinstance(trace, StreamingTrace):
+            trace.finish()
+        frames = frames(trace, interval) if callable(frames) else range(len(trace))
+    if out:
+        export_frames(fig, artists, draw_frame, init, list(frames), out, 1000 / interval, max_workers)
+        return None
+    if frames is not None:
+        return FuncAnimation(fig, draw_frame, frames=list(frames), init_func=init,
+                             interval=interval, blit=True, repeat=False)
+    if isinstance(trace, StreamingTrace):
+        fig.canvas.mpl_connect('close_event', lambda event: trace.cancel())
+        return FuncAnimation(fig, draw_frame, frames=trace.frames(), init_func=init,
+                             interval=interval, blit=True, repeat=False, cache_frame_data=False)
+    return FuncAnimation(fig, draw_frame, frames=len(trace), init_func=init,
+                         interval=interval, blit=True, repeat=False)
@@ -0,0 +1,256 @@
+# HPA*-style hierarchical pathfinding for large grids.
+#
+# The grid is cut into cluster_size x cluster_size clusters.  Wherever a move
+# crosses from one cluster into another, the border cells on each side form
+# runs (cells along a cluster edge are connected to each other), and one
+# crossing is kept for every pair of runs that touch: its two cells become
+# nodes of the abstract graph.  Inside a cluster, UCS on the cluster's own
+# sub-grid gives the cost between each pair of its nodes.
+#
+# A query links the start and target into the abstract graph with two more
+# cluster-local searches, runs Dijkstra on that small graph, and then refines
+# each step inside a cluster with ucs_search on that cluster only.  Paths are
+# near-optimal: they are forced through the chosen crossings.
+import heapq
+
+from grid_graph import Grid, MOVES_8, reversed_moves
+from ucs import terrain_costs, ucs_multi_source, ucs_search
+
+INF = float('inf')
+
+
+class ClusterGraph:
+
+    def __init__(self, grid, cluster_size=16, costs=None, moves=MOVES_8, entrance_spacing=16):
+        if set(moves) != set(reversed_moves(moves)):
+            raise ValueError("ClusterGraph needs a move set that contains the reverse of every move")
+        self.grid = Grid.coerce(grid)
+        self.cluster_size = cluster_size
+        self.entrance_spacing = entrance_spacing
+        self.moves = moves
+        self.step_costs = terrain_costs(self.grid, costs)
+        self.cluster_rows = -(-self.grid.rows // cluster_size)
+        self.cluster_cols = -(-self.grid.cols // cluster_size)
+        self._crossings = {}    # (cluster, cluster) -> [(cell, cell), ...]
+        self._inter = {}        # node -> {node in another cluster: cost}
+        self._transitions = {}  # cluster -> sorted node ids
+        self._intra = {}        # cluster -> {node: {node: cost}}
+        self.rebuild()
+
+    def rebuild(self):
+        for cluster in range(self.cluster_rows * self.cluster_cols):
+            for other in self._adjacent(cluster):
+                if other > cluster:
+                    self._link(cluster, other)
+        for cluster in range(self.cluster_rows * self.cluster_cols):
+            self._refresh_transitions(cluster)
+            self._connect(cluster)
+
+    def cluster_of(self, idx):
+        r, c = divmod(idx, self.grid.cols)
+        return (r // self.cluster_size) * self.cluster_cols + c // self.cluster_size
+
+    def node_count(self):
+        return sum(len(nodes) for nodes in self._transitions.values())
+
+    def set_cell(self, r, c, value):
+        # Only the changed cell's cluster, and the neighbours that share a
+        # border with it when the cell lies on that border, are recomputed
+        grid = self.grid
+        idx = r * grid.cols + c
+        was_wall = grid.cells[idx]
+        grid.set_cell(r, c, value)
+        if grid.cells[idx] == was_wall:
+            return
+        cluster = self.cluster_of(idx)
+        touched = {cluster}
+        r0, c0, r1, c1 = self._bounds(cluster)
+        if r in (r0, r1 - 1) or c in (c0, c1 - 1):
+            neighbours = self._adjacent(cluster)
+            for other in neighbours:
+                self._link(min(cluster, other), max(cluster, other))
+            touched.update(other for other in neighbours if self._refresh_transitions(other))
+        self._refresh_transitions(cluster)
+        for changed in touched:
+            self._connect(changed)
+
+    def find_path(self, start, target):
+        grid = self.grid
+        source, goal = grid.index(start), grid.index(target)
+        if source == goal:
+            return [tuple(start)]
+        if grid.cells[source] or grid.cells[goal]:
+            return []
+
+        # Local links: start to its cluster's nodes, its cluster's nodes to target
+        start_cluster, goal_cluster = self.cluster_of(source), self.cluster_of(goal)
+        start_nodes, goal_nodes = self._transitions[start_cluster], self._transitions[goal_cluster]
+        start_edges = self._local_costs(start_cluster, source, start_nodes + [goal]
+                                        if start_cluster == goal_cluster else start_nodes)
+        goal_edges = self._local_costs(goal_cluster, goal, goal_nodes, towards=True)
+
+        # Dijkstra on the abstract graph
+        dist = {source: 0}
+        parent = {source: None}
+        queue = [(0, source)]
+        done = set()
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in done:
+                continue
+            done.add(node)
+            if node == goal:
+                break
+            if node == source:
+                edges = list(start_edges.items())
+            else:
+                edges = list(self._intra[self.cluster_of(node)].get(node, {}).items())
+            edges.extend(self._inter.get(node, {}).items())
+            if node in goal_edges:
+                edges.append((goal, goal_edges[node]))
+            for nxt, step in edges:
+                new_cost = cost + step
+                if new_cost < dist.get(nxt, INF):
+                    dist[nxt] = new_cost
+                    parent[nxt] = node
+                    heapq.heappush(queue, (new_cost, nxt))
+        if goal not in done:
+            return []
+
+        abstract = []
+        node = goal
+        while node is not None:
+            abstract.append(node)
+            node = parent[node]
+        abstract.reverse()
+
+        # Refine: crossings are single moves, other steps stay inside a cluster
+        path = [grid.cell(source)]
+        for a, b in zip(abstract, abstract[1:]):
+            if self.cluster_of(a) != self.cluster_of(b):
+                path.append(grid.cell(b))
+            else:
+                path.extend(self._local_path(a, b)[1:])
+        return path
+
+    def _adjacent(self, cluster):
+        R, C = divmod(cluster, self.cluster_cols)
+        return [(R + dR) * self.cluster_cols + C + dC
+                for dR in (-1, 0, 1) for dC in (-1, 0, 1)
+                if (dR or dC) and 0 <= R + dR < self.cluster_rows and 0 <= C + dC < self.cluster_cols]
+
+    def _bounds(self, cluster):
+        R, C = divmod(cluster, self.cluster_cols)
+        r0, c0 = R * self.cluster_size, C * self.cluster_size
+        return r0, c0, min(r0 + self.cluster_size, self.grid.rows), min(c0 + self.cluster_size, self.grid.cols)
+
+    def _subgrid(self, cluster):
+        # The cluster as its own Grid plus its flat step costs
+        grid, costs = self.grid, self.step_costs
+        r0, c0, r1, c1 = self._bounds(cluster)
+        cells = bytearray()
+        sub_costs = costs[:0]
+        for r in range(r0, r1):
+            cells += grid.cells[r * grid.cols + c0:r * grid.cols + c1]
+            sub_costs += costs[r * grid.cols + c0:r * grid.cols + c1]
+        return Grid(r1 - r0, c1 - c0, cells), sub_costs, r0, c0
+
+    def _border(self, cluster):
+        r0, c0, r1, c1 = self._bounds(cluster)
+        cols = self.grid.cols
+        ring = {r * cols + c for r in (r0, r1 - 1) for c in range(c0, c1)}
+        ring.update(r * cols + c for r in range(r0, r1) for c in (c0, c1 - 1))
+        return ring
+
+    def _runs(self, side):
+        # Labels each cell in side with a representative of its run, the
+        # border cells connected to it through side
+        offsets, targets = self.grid.neighbors(self.moves)
+        run = {}
+        for seed in side:
+            if seed in run:
+                continue
+            run[seed] = seed
+            stack = [seed]
+            while stack:
+                node = stack.pop()
+                for k in range(offsets[node], offsets[node + 1]):
+                    nxt = targets[k]
+                    if nxt in side and nxt not in run:
+                        run[nxt] = seed
+                        stack.append(nxt)
+        return run
+
+    def _link(self, cluster, other):
+        cells, costs = self.grid.cells, self.step_costs
+        offsets, targets = self.grid.neighbors(self.moves)
+        for a, b in self._crossings.pop((cluster, other), ()):
+            del self._inter[a][b]
+            del self._inter[b][a]
+
+        crossings = []
+        for a in sorted(self._border(cluster)):
+            if cells[a]:
+                continue
+            for k in range(offsets[a], offsets[a + 1]):
+                b = targets[k]
+                if not cells[b] and self.cluster_of(b) == other:
+                    crossings.append((a, b))
+        runs_a = self._runs({a for a, b in crossings})
+        runs_b = self._runs({b for a, b in crossings})
+        grouped = {}
+        for a, b in crossings:
+            grouped.setdefault((runs_a[a], runs_b[b]), []).append((a, b))
+
+        # Each entrance keeps one crossing per entrance_spacing candidates,
+        # centred, so short ones keep just their middle crossing and long ones
+        # leave paths a few places to cross
+        chosen = []
+        spacing = self.entrance_spacing
+        for group in grouped.values():
+            chosen.extend(group[(len(group) % spacing) // 2::spacing])
+        self._crossings[(cluster, other)] = chosen
+        for a, b in chosen:
+            self._inter.setdefault(a, {})[b] = costs[b]
+            self._inter.setdefault(b, {})[a] = costs[a]
+
+    def _refresh_transitions(self, cluster):
+        nodes = set()
+        for other in self._adjacent(cluster):
+            for a, b in self._crossings.get((min(cluster, other), max(cluster, other)), ()):
+                nodes.add(a if cluster < other else b)
+        nodes = sorted(nodes)
+        changed = nodes != self._transitions.get(cluster)
+        self._transitions[cluster] = nodes
+        return changed
+
+    def _local_costs(self, cluster, node, targets, towards=False, sub=None):
+        # Costs from node to each of targets (from each of them to node with
+        # towards=True) over paths that stay inside the cluster
+        sub_grid, sub_costs, r0, c0 = sub or self._subgrid(cluster)
+        r, c = self.grid.cell(node)
+        best = ucs_multi_source(sub_grid, [(r - r0, c - c0)], costs=sub_costs, moves=self.moves,
+                                towards=towards)[0]
+        costs = {}
+        for other in targets:
+            r, c = self.grid.cell(other)
+            cost = best[(r - r0) * sub_grid.cols + c - c0]
+            if cost != INF:
+                costs[other] = cost
+        return costs
+
+    def _connect(self, cluster):
+        nodes = self._transitions[cluster]
+        sub = self._subgrid(cluster)
+        edges = {}
+        for node in nodes:
+            edges[node] = self._local_costs(cluster, node, nodes, sub=sub)
+            edges[node].pop(node, None)
+        self._intra[cluster] = edges
+
+    def _local_path(self, a, b):
+        sub, sub_costs, r0, c0 = self._subgrid(self.cluster_of(a))
+        (ar, ac), (br, bc) = self.grid.cell(a), self.grid.cell(b)
+        local = ucs_search(sub, (ar - r0, ac - c0), (br - r0, bc - c0), costs=sub_costs,
+                           moves=self.moves)
+        return [(r + r0, c + c0) for r, c in local]
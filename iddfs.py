@@ -1,151 +1,213 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.animation import FuncAnimation
-
-def dls_iteration(grid, start, target, limit, rows, cols):
-    states = []
-    visited_this_run = set()
-    parent = {start: None} # Needed to reconstruct the path
-    
-    def recursive_dls(node, depth):
-        if depth > limit:
-            return False
-        
-        visited_this_run.add(node)
-        row, col = node
-        
+from array import array
+from grid_graph import Grid, MOVES_6, reversed_moves
+from search_trace import SearchTrace, stream_search
+
+def dls_iteration(grid, start, target, limit, trace=None, transposition=False):
+    # Returns (final_path, number of cells expanded).  By default a cell that
+    # was already reached in this iteration is never entered again, which can
+    # hide a shallower route to it.  With transposition=True, best_depth keeps
+    # the shallowest depth each cell was reached at and a cell is only pruned
+    # when it was already reached at a depth <= the current one.
+    grid = Grid.coerce(grid)
+    cells = grid.cells
+    # Directions: Up, Right, Bottom, Bottom-Right, Left, Top-Left
+    offsets, targets = grid.neighbors(MOVES_6)
+    source, goal = grid.index(start), grid.index(target)
+    best_depth = array('i', [limit + 1]) * len(grid)
+    if trace is not None:
+        trace.reset()
+        trace.note('limit', limit)
+
+    # Explicit-stack depth-first search, see dls_search in dls.py: stack is
+    # the current path from the start and is used to rebuild the final path
+    best_depth[source] = 0
+    expanded = 1
+    if trace is not None:
         # Capture state for animation
-        states.append({
-            'current': node,
-            'visited': visited_this_run.copy(),
-            'depth': depth,
-            'limit': limit,
-            'path': []
-        })
-
-        if node == target:
-            return True
-        
-        # Directions: Up, Right, Bottom, Bottom-Right, Left, Top-Left
-        directions = [(-1, 0), (0, 1), (1, 0), (1, 1), (0, -1), (-1, -1)]
-        
-        for dr, dc in directions:
-            nr, nc = row + dr, col + dc
-            if (0 <= nr < rows and 0 <= nc < cols and 
-                grid[nr][nc] != 1 and (nr, nc) not in visited_this_run):
-                parent[(nr, nc)] = node
-                if recursive_dls((nr, nc), depth + 1):
-                    return True
-        return False
-
-    found = recursive_dls(start, 0)
+        trace.visit(start)
+        trace.note('current', start)
+        trace.note('depth', 0)
+        trace.step()
+    found = source == goal
+    stack = [source]
+    next_edge = [offsets[source]]
+
+    while stack and not found:
+        node = stack[-1]
+        depth = len(stack)  # depth of the children of node
+        prune_at = depth if transposition else limit
+        # Children of a node at the limit would be rejected, so skip them
+        end = offsets[node + 1] if depth <= limit else next_edge[-1]
+        k = next_edge[-1]
+        while k < end:
+            nxt = targets[k]
+            k += 1
+            if not cells[nxt] and best_depth[nxt] > prune_at:
+                break
+        else:
+            stack.pop()
+            next_edge.pop()
+            continue
+        next_edge[-1] = k
+
+        best_depth[nxt] = depth
+        expanded += 1
+        if trace is not None:
+            trace.visit(grid.cell(nxt))
+            trace.note('current', grid.cell(nxt))
+            trace.note('depth', depth)
+            trace.step()
+        stack.append(nxt)
+        next_edge.append(offsets[nxt])
+        found = nxt == goal
     
     final_path = []
     if found:
-        # Reconstruct path by following parents back to start
-        curr = target
-        while curr is not None:
-            final_path.append(curr)
-            curr = parent.get(curr)
-        final_path.reverse()
+        final_path = [grid.cell(node) for node in stack]
         
-        # Add a final state to display the completed path
-        states.append({
-            'current': target,
-            'visited': visited_this_run.copy(),
-            'depth': limit,
-            'limit': limit,
-            'path': final_path
-        })
-
-    return states, found
-
-def iddfs_visualized(grid, start, target, max_depth):
-    rows, cols = len(grid), len(grid[0])
-    all_animation_states = []
+        if trace is not None:
+            # Add a final state to display the completed path
+            trace.note('current', target)
+            trace.note('depth', limit)
+            trace.note('path', final_path)
+            trace.step()
+
+    return final_path, expanded
+
+def iddfs_search(grid, start, target, max_depth, trace=None, transposition=False,
+                 carry_over=False, expansions=None):
+    # transposition=True uses the best-depth table in every iteration, so the
+    # first path found is a shortest one.  carry_over=True also keeps that
+    # table between iterations and only extends the previous iteration's
+    # deepest layer.  If expansions is a list, one (limit, cells expanded)
+    # pair is appended per iteration.
+    grid = Grid.coerce(grid)
+    if carry_over:
+        return _iddfs_carry_over(grid, start, target, max_depth, trace, expansions)
     
     for current_limit in range(max_depth + 1):
-        iteration_results, found = dls_iteration(grid, start, target, current_limit, rows, cols)
-        all_animation_states.extend(iteration_results)
+        final_path, expanded = dls_iteration(grid, start, target, current_limit,
+                                             trace, transposition)
+        if expansions is not None:
+            expansions.append((current_limit, expanded))
         
-        if found: # Found the path at the shallowest depth!
-            break
+        if final_path: # Found the path at the shallowest depth!
+            return final_path
             
-    return all_animation_states
+    return []
 
-def visualize_iddfs(grid, start, target, max_depth):
-    states = iddfs_visualized(grid, start, target, max_depth)
-    rows, cols = len(grid), len(grid[0])
-    
-    # Using a larger width to prevent the sidebar from squashing the grid
-    fig, ax = plt.subplots(figsize=(14, 8))
-    plt.subplots_adjust(right=0.7) 
-
-    def draw_grid(state_idx):
-        ax.clear()
-        active_idx = min(state_idx, len(states) - 1)
-        curr_state = states[active_idx]
-        path_cells = curr_state.get('path', [])
-
-        for i in range(rows):
-            for j in range(cols):
-                if grid[i][j] == 1: color = 'black'
-                elif (i, j) == start: color = 'green'
-                elif (i, j) == target: color = 'orange'
-                elif (i, j) in path_cells: color = 'magenta' # Final path
-                elif (i, j) == curr_state['current']: color = 'red'
-                elif (i, j) in curr_state['visited']: color = 'lightblue'
-                else: color = 'white'
-                
-                rect = patches.Rectangle((j - 0.5, i - 0.5), 1, 1,
-                                         linewidth=1, edgecolor='gray', facecolor=color)
-                ax.add_patch(rect)
-                ax.text(j, i, f'({i},{j})', ha='center', va='center', fontsize=8, color='darkgray')
-
-        # Draw a line through the final path for clarity
-        if path_cells:
-            py, px = zip(*path_cells)
-            ax.plot(px, py, color='white', linewidth=3, alpha=0.7)
-
-        ax.set_xticks(range(cols))
-        ax.set_yticks(range(rows))
-        ax.set_xlim(-0.5, cols - 0.5)
-        ax.set_ylim(-0.5, rows - 0.5)
-        ax.invert_yaxis()
-        ax.set_aspect('equal')
-        
+def _iddfs_carry_over(grid, start, target, max_depth, trace, expansions):
+    # After a complete iteration with the best-depth table, every cell within
+    # limit moves holds its exact depth.  The next iteration therefore only has
+    # to push the cells at depth == limit one move further; everything
+    # shallower would be re-expanded with the same result.  This trades the
+    # O(depth) memory of plain IDDFS for one depth entry per cell.
+    cells = grid.cells
+    offsets, targets = grid.neighbors(MOVES_6)
+    source, goal = grid.index(start), grid.index(target)
+    depth = array('i', [-1]) * len(grid)
+    depth[source] = 0
+    frontier = [source]
+    if trace is not None:
+        trace.note('limit', 0)
+        trace.visit(start)
+        trace.note('current', start)
+        trace.note('depth', 0)
+        trace.step()
+    if expansions is not None:
+        expansions.append((0, 1))
+
+    current_limit = 0
+    while depth[goal] < 0 and frontier and current_limit < max_depth:
+        current_limit += 1
+        if trace is not None:
+            trace.note('limit', current_limit)
+        next_frontier = []
+        for node in frontier:
+            for k in range(offsets[node], offsets[node + 1]):
+                nxt = targets[k]
+                if not cells[nxt] and depth[nxt] < 0:
+                    depth[nxt] = current_limit
+                    next_frontier.append(nxt)
+                    if trace is not None:
+                        trace.visit(grid.cell(nxt))
+                        trace.note('current', grid.cell(nxt))
+                        trace.note('depth', current_limit)
+                        trace.step()
+        if expansions is not None:
+            expansions.append((current_limit, len(next_frontier)))
+        frontier = next_frontier
+
+    if depth[goal] < 0:
+        return []
+
+    # Walk back through cells one level shallower each time
+    back_offsets, back_targets = grid.neighbors(reversed_moves(MOVES_6))
+    node = goal
+    final_path = [target]
+    while node != source:
+        for k in range(back_offsets[node], back_offsets[node + 1]):
+            prev = back_targets[k]
+            if depth[prev] == depth[node] - 1 and not cells[prev]:
+                node = prev
+                break
+        final_path.append(grid.cell(node))
+    final_path.reverse()
+
+    if trace is not None:
+        trace.note('current', target)
+        trace.note('depth', current_limit)
+        trace.note('path', final_path)
+        trace.step()
+    return final_path
+
+def iddfs_visualized(grid, start, target, max_depth, transposition=False, carry_over=False):
+    # One trace for all iterations; each iteration resets the visited layer
+    trace = SearchTrace()
+    iddfs_search(grid, start, target, max_depth, trace, transposition, carry_over)
+    return trace
+
+def visualize_iddfs(grid, start, target, max_depth, transposition=False, carry_over=False,
+                     out=None, frames=None):
+    import matplotlib.pyplot as plt
+    from grid_renderer import animate_trace
+
+    trace = stream_search(iddfs_search, grid, start, target, max_depth,
+                          transposition=transposition, carry_over=carry_over)
+
+    def status(state_idx, curr_state):
+        path_cells = curr_state.get('path')
         if path_cells:
-            status_text = f"--- IDDFS SUCCESS ---\n\nPath Found at limit: {curr_state['limit']}\nLength: {len(path_cells)}"
-        elif state_idx < len(states):
-            status_text = (f"--- IDDFS STATUS ---\n\n"
-                           f"CURRENT LIMIT: {curr_state['limit']}\n"
-                           f"Step: {state_idx + 1}\n\n"
-                           f"Exploring: {curr_state['current']}")
-        else:
-            status_text = "--- IDDFS COMPLETE ---\n\nNo path found."
+            return f"--- IDDFS SUCCESS ---\n\nPath Found at limit: {curr_state['limit']}\nLength: {len(path_cells)}"
+        elif state_idx < len(trace):
+            return (f"--- IDDFS STATUS ---\n\n"
+                    f"CURRENT LIMIT: {curr_state['limit']}\n"
+                    f"Step: {state_idx + 1}\n\n"
+                    f"Exploring: {curr_state['current']}")
+        return "--- IDDFS COMPLETE ---\n\nNo path found."
 
-        ax.text(cols + 0.3, rows // 2, status_text, fontsize=13, fontweight='bold', 
-                va='center', bbox=dict(facecolor='white', alpha=0.8, edgecolor='black'))
-        
-        legend_elements = [
-            patches.Patch(facecolor='green', label='Start'),
-            patches.Patch(facecolor='orange', label='Target'),
-            patches.Patch(facecolor='magenta', label='Final Path'),
-            patches.Patch(facecolor='red', label='Current'),
-            patches.Patch(facecolor='lightblue', label='Visited (This iteration)'),
-            patches.Patch(facecolor='black', label='Obstacle')
-        ]
-        ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.05, 1))
-
-    ani = FuncAnimation(fig, draw_grid, frames=len(states), interval=150, repeat=False)
-    plt.show()
-
-grid = [
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 0, 0],
-    [0, 0, 0, 0, 0],
-    [0, 0, 1, 1, 0],
-    [0, 0, 0, 0, 0]
-]
-
-visualize_iddfs(grid, (0, 0), (4, 4), max_depth=10)
\ No newline at end of file
+    legend_elements = [
+        ('green', 'Start'),
+        ('orange', 'Target'),
+        ('magenta', 'Final Path'),
+        ('red', 'Current'),
+        ('lightblue', 'Visited (This iteration)'),
+        ('black', 'Obstacle')
+    ]
+
+    # Using a larger width to prevent the sidebar from squashing the grid
+    ani = animate_trace(grid, trace, start, target, legend_elements, status,
+                        interval=150, out=out, frames=frames)
+    if out is None:
+        plt.show()
+
+if __name__ == '__main__':
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    visualize_iddfs(grid, (0, 0), (4, 4), max_depth=10)
@@ -0,0 +1,174 @@
+# Jump Point Search for the 8-connected, uniform-cost model of ucs.py.
+#
+# Every move costs 1 and diagonal moves may cut corners, as in ucs_search with
+# no costs.  From each expanded cell JPS only follows the directions that an
+# optimal path could need (the natural and forced neighbours) and then keeps
+# stepping in that direction until it reaches a cell with a forced neighbour,
+# the target, or (for diagonals) a cell from which a straight jump succeeds.
+# Only those jump points enter the priority queue, which skips the many
+# equal-cost symmetric paths UCS has to expand on open maps.
+import heapq
+from array import array
+
+from astar import octile_distance
+from grid_graph import Grid
+from search_trace import SearchTrace, stream_search
+
+ALL_DIRECTIONS = ((-1, 0), (0, 1), (1, 0), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1))
+
+
+def jps_search(grid, start, target, trace=None):
+    grid = Grid.coerce(grid)
+    rows, cols, cells = grid.rows, grid.cols, grid.cells
+    target_r, target_c = target
+
+    def free(r, c):
+        return 0 <= r < rows and 0 <= c < cols and not cells[r * cols + c]
+
+    def jump(r, c, dr, dc):
+        # Steps from (r, c) in direction (dr, dc) and returns the first jump
+        # point as (r, c, steps), or None when a wall or the border is hit
+        steps = 0
+        while True:
+            r += dr
+            c += dc
+            steps += 1
+            if not free(r, c):
+                return None
+            if r == target_r and c == target_c:
+                return r, c, steps
+            if dr and dc:
+                if (not free(r - dr, c) and free(r - dr, c + dc)) or \
+                        (not free(r, c - dc) and free(r + dr, c - dc)):
+                    return r, c, steps
+                if jump(r, c, dr, 0) or jump(r, c, 0, dc):
+                    return r, c, steps
+            elif dr:
+                if (not free(r, c + 1) and free(r + dr, c + 1)) or \
+                        (not free(r, c - 1) and free(r + dr, c - 1)):
+                    return r, c, steps
+            else:
+                if (not free(r + 1, c) and free(r + 1, c + dc)) or \
+                        (not free(r - 1, c) and free(r - 1, c + dc)):
+                    return r, c, steps
+
+    def directions(r, c, dr, dc):
+        # Natural and forced neighbours for a cell entered moving (dr, dc)
+        if not dr and not dc:
+            return ALL_DIRECTIONS
+        if dr and dc:
+            found = [(dr, 0), (0, dc), (dr, dc)]
+            if not free(r - dr, c):
+                found.append((-dr, dc))
+            if not free(r, c - dc):
+                found.append((dr, -dc))
+        elif dr:
+            found = [(dr, 0)]
+            if not free(r, c + 1):
+                found.append((dr, 1))
+            if not free(r, c - 1):
+                found.append((dr, -1))
+        else:
+            found = [(0, dc)]
+            if not free(r + 1, c):
+                found.append((1, dc))
+            if not free(r - 1, c):
+                found.append((-1, dc))
+        return found
+
+    source, goal = grid.index(start), grid.index(target)
+    # best stores the cost of the cheapest known path to each jump point
+    best = array('i', [-1]) * len(grid)
+    parent = array('i', [-1]) * len(grid)
+    settled = bytearray(len(grid))
+    best[source] = 0
+    # Chebyshev distance is exact on an empty grid, so this is A* with a
+    # consistent heuristic and returns the same optimal cost as UCS
+    priority_queue = [(octile_distance(target_r - start[0], target_c - start[1]), source)]
+    if trace is not None:
+        trace.push(start)
+
+    found = False
+    while priority_queue:
+        node = heapq.heappop(priority_queue)[1]
+        if trace is not None:
+            trace.pop(grid.cell(node))
+        if settled[node]:
+            continue
+
+        settled[node] = 1
+        cost = best[node]
+        r, c = divmod(node, cols)
+        if trace is not None:
+            trace.visit((r, c), cost)
+            trace.note('current', (r, c))
+            trace.note('cost', cost)
+            trace.step()
+
+        if node == goal:
+            found = True
+            break
+
+        dr = dc = 0
+        if parent[node] >= 0:
+            pr, pc = divmod(parent[node], cols)
+            dr, dc = (r > pr) - (r < pr), (c > pc) - (c < pc)
+        for step_r, step_c in directions(r, c, dr, dc):
+            point = jump(r, c, step_r, step_c)
+            if point is None:
+                continue
+            jr, jc, steps = point
+            nxt = jr * cols + jc
+            new_cost = cost + steps
+            if not settled[nxt] and (best[nxt] < 0 or new_cost < best[nxt]):
+                best[nxt] = new_cost
+                parent[nxt] = node
+                heapq.heappush(priority_queue,
+                               (new_cost + octile_distance(target_r - jr, target_c - jc), nxt))
+                if trace is not None:
+                    trace.push((jr, jc))
+
+    final_path = []
+    if found:
+        # Fill in the straight and diagonal runs between consecutive jump points
+        jump_points = grid.parent_path(parent, goal)
+        final_path = [jump_points[0]]
+        for jr, jc in jump_points[1:]:
+            r, c = final_path[-1]
+            dr, dc = (jr > r) - (jr < r), (jc > c) - (jc < c)
+            while (r, c) != (jr, jc):
+                r, c = r + dr, c + dc
+                final_path.append((r, c))
+
+        if trace is not None:
+            trace.clear_frontier()
+            trace.note('current', target)
+            trace.note('path', final_path)
+            trace.step()
+
+    return final_path
+
+
+def jps_visualized(grid, start, target):
+    trace = SearchTrace()
+    jps_search(grid, start, target, trace)
+    return trace
+
+
+def visualize_jps(grid, start, target, out=None, frames=None):
+    from ucs import animate_ucs_trace
+
+    trace = stream_search(jps_search, grid, start, target)
+    animate_ucs_trace(grid, trace, start, target, 'JPS', out, frames)
+
+
+if __name__ == '__main__':
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    visualize_jps(grid, (0, 0), (4, 4))
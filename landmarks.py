@@ -0,0 +1,232 @@
+# ALT (A*, landmarks, triangle inequality) distance oracle.
+#
+# For each landmark L the tables hold d(L, v) and d(v, L) for every cell as
+# int32 (-1 = unreachable).  Costs are paid on entering a cell, so the two
+# differ on weighted maps.  The triangle inequality then bounds any distance:
+#
+#     d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+#
+# The largest bound over the landmarks is an admissible, consistent A*
+# heuristic and, on its own, an O(landmarks) lower bound for filtering.
+import hashlib
+import random
+import struct
+from array import array
+
+from bfs import bfs_multi_source
+from grid_graph import Grid, MOVES_6, MOVES_8, reversed_moves
+from ucs import terrain_costs, ucs_multi_source, ucs_search
+
+MAGIC = b'ALT1'
+HEADER = struct.Struct('<4sIIII16s')
+
+
+class Landmarks:
+
+    def __init__(self, grid, costs=None, moves=MOVES_8):
+        self.grid = Grid.coerce(grid)
+        self.moves = moves
+        self.step_costs = terrain_costs(self.grid, costs)
+        if self.step_costs.typecode != 'i':
+            raise ValueError("Landmark tables store int32 distances, costs must be integers")
+        self.uniform = costs is None
+        self.cells = []
+        self.forward = []   # forward[i][v] = d(landmark i, v)
+        self.backward = []  # backward[i][v] = d(v, landmark i)
+
+    @classmethod
+    def select(cls, grid, count, strategy='farthest', costs=None, moves=MOVES_8, seed=0):
+        # 'farthest' repeatedly adds the cell farthest from every landmark so
+        # far, 'avoid' adds the leaf of the shortest-path tree region the
+        # current landmarks bound worst, and 'random' samples free cells
+        landmarks = cls(grid, costs, moves)
+        grid = landmarks.grid
+        free = [v for v in range(len(grid)) if not grid.cells[v]]
+        rng = random.Random(seed)
+        if strategy == 'random':
+            for v in rng.sample(free, min(count, len(free))):
+                landmarks.add(grid.cell(v))
+        elif strategy == 'farthest':
+            landmarks._select_farthest(count, free, rng)
+        elif strategy == 'avoid':
+            landmarks._select_avoid(count, free, rng)
+        else:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected 'farthest', 'avoid' or 'random'")
+        return landmarks
+
+    def add(self, cell):
+        forward = self._distances(cell, towards=False)
+        # Unit costs on a symmetric move set make both directions equal
+        symmetric = self.uniform and set(self.moves) == set(reversed_moves(self.moves))
+        backward = forward if symmetric else self._distances(cell, towards=True)
+        self.cells.append(tuple(cell))
+        self.forward.append(forward)
+        self.backward.append(backward)
+
+    def lower_bound(self, start, target):
+        # Returns a lower bound on the cost from start to target, or inf when
+        # the tables prove target cannot be reached
+        return self._bound(self.grid.index(start), self.grid.index(target))
+
+    def _bound(self, source, goal):
+        best = 0
+        for forward, backward in zip(self.forward, self.backward):
+            if forward[source] >= 0:
+                if forward[goal] < 0:
+                    return float('inf')
+                best = max(best, forward[goal] - forward[source])
+            if backward[goal] >= 0:
+                if backward[source] < 0:
+                    return float('inf')
+                best = max(best, backward[source] - backward[goal])
+        return best
+
+    def heuristic(self, target):
+        # Function of a cell id for ucs_search(heuristic=...)
+        goal = self.grid.index(target)
+        terms = [(forward, forward[goal], backward, backward[goal])
+                 for forward, backward in zip(self.forward, self.backward)]
+
+        def heuristic(node):
+            # Same rules as _bound: inf marks a cell the target is proven
+            # unreachable from
+            best = 0
+            for forward, forward_goal, backward, backward_goal in terms:
+                if forward[node] >= 0:
+                    if forward_goal < 0:
+                        return float('inf')
+                    if forward_goal - forward[node] > best:
+                        best = forward_goal - forward[node]
+                if backward_goal >= 0:
+                    if backward[node] < 0:
+                        return float('inf')
+                    if backward[node] - backward_goal > best:
+                        best = backward[node] - backward_goal
+            return best
+
+        return heuristic
+
+    def search(self, start, target, trace=None, queue='auto'):
+        # A* with the landmark heuristic on the same costs and moves.  'auto'
+        # takes the bucket queue only for move sets that contain their own
+        # reverses; with one-way moves the heap is used, which does not rely
+        # on the priorities never decreasing
+        if queue == 'auto':
+            queue = 'bucket' if set(self.moves) == set(reversed_moves(self.moves)) else 'heap'
+        return ucs_search(self.grid, start, target, trace, self.step_costs, queue, self.moves,
+                          self.heuristic(target))
+
+    def save(self, path):
+        moves = array('b', [step for move in self.moves for step in move])
+        landmarks = array('i', [self.grid.index(cell) for cell in self.cells])
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.grid.rows, self.grid.cols, len(self.cells),
+                                len(self.moves), self._digest()))
+            moves.tofile(f)
+            landmarks.tofile(f)
+            for forward, backward in zip(self.forward, self.backward):
+                forward.tofile(f)
+                backward.tofile(f)
+
+    @classmethod
+    def load(cls, path, grid, costs=None):
+        # The grid and costs must be the ones the tables were built for
+        landmarks = cls(grid, costs)
+        grid = landmarks.grid
+        with open(path, 'rb') as f:
+            magic, rows, cols, count, move_count, digest = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a landmark table file")
+            moves = array('b')
+            moves.fromfile(f, 2 * move_count)
+            landmarks.moves = tuple(zip(moves[::2], moves[1::2]))
+            if (rows, cols) != (grid.rows, grid.cols) or digest != landmarks._digest():
+                raise ValueError(f"{path} was built for a different grid or costs")
+            cells = array('i')
+            cells.fromfile(f, count)
+            for v in cells:
+                forward, backward = array('i'), array('i')
+                forward.fromfile(f, len(grid))
+                backward.fromfile(f, len(grid))
+                landmarks.cells.append(grid.cell(v))
+                landmarks.forward.append(forward)
+                landmarks.backward.append(backward)
+        return landmarks
+
+    def _digest(self):
+        digest = hashlib.blake2b(self.grid.cells, digest_size=16)
+        digest.update(self.step_costs)
+        return digest.digest()
+
+    def _distances(self, cell, towards):
+        # Whole-grid distances from (or with towards=True, to) cell as int32
+        if self.uniform and self.moves == MOVES_6:
+            return bfs_multi_source(self.grid, [cell], towards=towards)[0]
+        best = ucs_multi_source(self.grid, [cell], costs=self.step_costs, moves=self.moves,
+                                towards=towards)[0]
+        return array('i', [int(cost) if cost != float('inf') else -1 for cost in best])
+
+    def _select_farthest(self, count, free, rng):
+        if not free:
+            return
+        # Start from the cell farthest from a random one, then keep adding the
+        # cell whose nearest landmark is farthest away (unreached counts as
+        # farthest, so other components get a landmark too)
+        seed_distances = self._distances(self.grid.cell(rng.choice(free)), towards=False)
+        candidate = max(free, key=seed_distances.__getitem__)
+        closest = {}
+        while len(self.cells) < min(count, len(free)):
+            self.add(self.grid.cell(candidate))
+            distances = self.forward[-1]
+            for v in free:
+                if distances[v] >= 0 and (v not in closest or distances[v] < closest[v]):
+                    closest[v] = distances[v]
+            taken = {self.grid.index(cell) for cell in self.cells}
+            candidate = max((v for v in free if v not in taken),
+                            key=lambda v: closest.get(v, float('inf')), default=None)
+            if candidate is None:
+                break
+
+    def _select_avoid(self, count, free, rng):
+        # Goldberg and Harrelson's avoid: grow a shortest-path tree from a
+        # random root, weight each cell by how far its current lower bound
+        # falls short of its true distance, and follow the heaviest subtree
+        # that holds no landmark down to a leaf
+        grid = self.grid
+        while len(self.cells) < min(count, len(free)):
+            root = rng.choice(free)
+            if self.uniform and self.moves == MOVES_6:
+                distance, nearest, parent = bfs_multi_source(grid, [grid.cell(root)])
+            else:
+                distance, nearest, parent = ucs_multi_source(grid, [grid.cell(root)], costs=self.step_costs,
+                                                             moves=self.moves)
+            children = {}
+            for v in free:
+                if parent[v] >= 0:
+                    children.setdefault(parent[v], []).append(v)
+            order = [root]
+            for v in order:
+                order.extend(children.get(v, ()))
+
+            # Children come after their parent in order, so walking it
+            # backwards completes every subtree before its root
+            taken = {grid.index(cell) for cell in self.cells}
+            size = {}
+            blocked = set()
+            for v in reversed(order):
+                below = children.get(v, ())
+                if v in taken or any(child in blocked for child in below):
+                    blocked.add(v)
+                    size[v] = 0
+                else:
+                    size[v] = distance[v] - self._bound(root, v) + sum(size[child] for child in below)
+
+            node = root
+            while children.get(node):
+                heaviest = max(children[node], key=size.__getitem__)
+                if size[heaviest] <= 0:
+                    break
+                node = heaviest
+            if node in taken:
+                node = rng.choice([v for v in free if v not in taken])
+            self.add(grid.cell(node))
@@ -0,0 +1,118 @@
+# Loading large maps from disk without building nested Python lists.
+#
+# Three formats are understood, told apart by their first bytes:
+#
+#   raw bytes   b'GRID' + rows, cols as little-endian uint32, then one byte per
+#               cell row by row (0 = free, anything else = wall).  The file is
+#               mmapped and the Grid reads its cells straight from the mapping.
+#   raw bits    b'GBIT' + rows, cols, then one bit per cell (1 = wall), most
+#               significant bit first.  Unpacked once to one byte per cell.
+#   MovingAI    the text .map format ('type octile', 'height', 'width', 'map').
+#               The mmapped text is turned into cells with one bytes.translate
+#               pass that also drops the line breaks.
+#
+# Maps are opened copy-on-write, so grid.set_cell works but never touches the
+# file.  Note that the searches build a CSR neighbour table on first use,
+# about 4 * (moves + 1) bytes per cell, which dwarfs the cells themselves.
+import mmap
+import struct
+
+from grid_graph import Grid
+
+RAW_MAGIC = b'GRID'
+BITS_MAGIC = b'GBIT'
+HEADER = struct.Struct('<4sII')
+
+# MovingAI terrain that ground units can cross: free, grass and swamp
+MOVINGAI_PASSABLE = b'.GS'
+
+# BIT_TABLES[k] maps a packed byte to 1 when bit k (MSB first) is set
+BIT_TABLES = [bytes((value >> (7 - k)) & 1 for value in range(256)) for k in range(8)]
+# PACKED maps eight 0/1 cells back to their packed byte
+PACKED = {bytes(table[value] for table in BIT_TABLES): value for value in range(256)}
+# Turns any nonzero wall byte into 1
+WALL_BITS = bytes([0]) + bytes([1]) * 255
+
+
+def load_map(path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == RAW_MAGIC:
+        return load_raw(path)
+    if magic == BITS_MAGIC:
+        return load_bits(path)
+    return load_movingai(path)
+
+
+def _map_file(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+
+def _read_header(mapping, magic, path):
+    found, rows, cols = HEADER.unpack_from(mapping)
+    if found != magic:
+        raise ValueError(f"{path} does not start with {magic!r}")
+    return rows, cols
+
+
+def load_raw(path):
+    mapping = _map_file(path)
+    rows, cols = _read_header(mapping, RAW_MAGIC, path)
+    if len(mapping) < HEADER.size + rows * cols:
+        raise ValueError(f"{path} is truncated: expected {rows * cols} cells")
+    # The memoryview keeps the mapping alive for as long as the Grid uses it
+    return Grid(rows, cols, memoryview(mapping)[HEADER.size:HEADER.size + rows * cols])
+
+
+def load_bits(path):
+    mapping = _map_file(path)
+    rows, cols = _read_header(mapping, BITS_MAGIC, path)
+    packed = mapping[HEADER.size:HEADER.size + (rows * cols + 7) // 8]
+    if len(packed) * 8 < rows * cols:
+        raise ValueError(f"{path} is truncated: expected {rows * cols} cells")
+    # One translate per bit position, written into every eighth cell
+    cells = bytearray(len(packed) * 8)
+    for k, table in enumerate(BIT_TABLES):
+        cells[k::8] = packed.translate(table)
+    del cells[rows * cols:]
+    return Grid(rows, cols, cells)
+
+
+def load_movingai(path, passable=MOVINGAI_PASSABLE):
+    mapping = _map_file(path)
+    header = {}
+    while True:
+        line = mapping.readline()
+        if not line:
+            raise ValueError(f"{path} has no 'map' line")
+        words = line.split()
+        if words == [b'map']:
+            break
+        if len(words) == 2:
+            header[words[0].decode()] = words[1].decode()
+    rows, cols = int(header['height']), int(header['width'])
+
+    table = bytearray([1]) * 256
+    for code in passable:
+        table[code] = 0
+    cells = bytearray(mapping[mapping.tell():].translate(table, b'\r\n'))
+    if len(cells) < rows * cols:
+        raise ValueError(f"{path} is truncated: expected {rows * cols} cells")
+    del cells[rows * cols:]
+    return Grid(rows, cols, cells)
+
+
+def save_raw(grid, path):
+    grid = Grid.coerce(grid)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(RAW_MAGIC, grid.rows, grid.cols))
+        f.write(grid.cells)
+
+
+def save_bits(grid, path):
+    grid = Grid.coerce(grid)
+    cells = bytes(grid.cells).translate(WALL_BITS) + bytes(-len(grid) % 8)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(BITS_MAGIC, grid.rows, grid.cols))
+        f.write(bytes(PACKED[cells[i:i + 8]] for i in range(0, len(cells), 8)))
@@ -0,0 +1,139 @@
+# LRU cache in front of the headless searches.
+#
+# Entries are keyed on a content hash of the grid (so a set_cell invalidates
+# them without any bookkeeping), the algorithm, its options and the
+# endpoints.  Paths are stored as array('i') of flat cell ids.  Once a start
+# has missed tree_after times for 'bfs' or 'ucs', the whole shortest-path tree
+# from it is cached instead and later targets become a walk up its parent array.
+import hashlib
+from array import array
+from collections import OrderedDict
+
+from bfs import bfs_multi_source
+from grid_graph import Grid, MOVES_8
+from pathfinder import find_path
+from ucs import terrain_costs, ucs_multi_source
+
+# Options that do not change which tree a search builds
+TREE_OPTIONS = {'bfs': set(), 'ucs': {'costs', 'moves', 'queue'}}
+
+# Rough per-entry cost on top of the array data
+ENTRY_OVERHEAD = 200
+
+
+def grid_fingerprint(grid):
+    grid = Grid.coerce(grid)
+    return grid.rows, grid.cols, hashlib.blake2b(grid.cells, digest_size=16).digest()
+
+
+def costs_fingerprint(grid, costs):
+    # Flat cost buffers (array('i'), array('d'), bytes, NumPy arrays) are
+    # hashed as they are.  Nested lists have to be flattened and checked by
+    # terrain_costs first, which dominates a cache hit on big maps, so pass
+    # the same flat array on every call when that matters.
+    try:
+        view = memoryview(costs)
+    except TypeError:
+        flat = terrain_costs(grid, costs)
+        return flat.typecode, hashlib.blake2b(flat, digest_size=16).digest()
+    data = view if view.c_contiguous else view.tobytes()
+    return view.format, hashlib.blake2b(data, digest_size=16).digest()
+
+
+class PathCache:
+
+    def __init__(self, max_entries=4096, max_bytes=64 * 2**20, tree_after=2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.tree_after = tree_after
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (array('i'), size in bytes)
+        self._bytes = 0
+        self._start_misses = {}
+
+    def find_path(self, grid, start, target, algorithm='bfs', **options):
+        if options.get('trace') is not None:
+            # A trace has to watch the search run, so it is never served from the cache
+            return find_path(grid, start, target, algorithm, **options)
+        grid = Grid.coerce(grid)
+        start, target = tuple(start), tuple(target)
+        tree_key = (grid_fingerprint(grid), algorithm, self._options_key(grid, options), start)
+        key = tree_key + (target,)
+
+        path = self._lookup(key)
+        if path is not None:
+            self.hits += 1
+            return [grid.cell(idx) for idx in path]
+        parent = self._lookup(tree_key)
+        if parent is not None:
+            self.tree_hits += 1
+            return self._tree_path(grid, parent, start, target)
+
+        self.misses += 1
+        if self._wants_tree(grid, algorithm, options, tree_key):
+            parent = self._build_tree(grid, start, algorithm, options)
+            self._store(tree_key, parent)
+            return self._tree_path(grid, parent, start, target)
+        path = find_path(grid, start, target, algorithm, **options)
+        self._store(key, array('i', [grid.index(cell) for cell in path]))
+        return path
+
+    def stats(self):
+        return {'hits': self.hits, 'tree_hits': self.tree_hits, 'misses': self.misses,
+                'entries': len(self._entries), 'bytes': self._bytes}
+
+    def clear(self):
+        self._entries.clear()
+        self._start_misses.clear()
+        self._bytes = 0
+
+    def _options_key(self, grid, options):
+        items = []
+        for name, value in sorted(options.items()):
+            if name == 'costs' and value is not None:
+                value = costs_fingerprint(grid, value)
+            items.append((name, value))
+        return tuple(items)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key, data):
+        size = ENTRY_OVERHEAD + data.itemsize * len(data)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (data, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def _wants_tree(self, grid, algorithm, options, tree_key):
+        if algorithm not in TREE_OPTIONS or not set(options) <= TREE_OPTIONS[algorithm]:
+            return False
+        if grid.is_wall(tree_key[-1]):
+            # Trees skip wall sources, while the searches still leave a wall start
+            return False
+        if len(self._start_misses) >= self.max_entries:
+            self._start_misses.clear()
+        count = self._start_misses[tree_key] = self._start_misses.get(tree_key, 0) + 1
+        return count >= self.tree_after
+
+    def _build_tree(self, grid, start, algorithm, options):
+        if algorithm == 'bfs':
+            return bfs_multi_source(grid, [start])[2]
+        return ucs_multi_source(grid, [start], costs=options.get('costs'),
+                                moves=options.get('moves', MOVES_8))[2]
+
+    def _tree_path(self, grid, parent, start, target):
+        # Same cost as the search itself; for UCS ties may pick another equally cheap path
+        idx = grid.index(target)
+        if target != start and parent[idx] < 0:
+            return []
+        return grid.parent_path(parent, idx)
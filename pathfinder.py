@@ -0,0 +1,51 @@
+# Headless entry point for the search algorithms.
+#
+# Importing this module (or any of the algorithm scripts) only pulls in the
+# standard library; matplotlib is imported lazily by the visualize_* functions.
+from bfs import bfs_search, bfs_multi_target, bfs_multi_source
+from dfs import dfs_search
+from ucs import ucs_search, bidirectional_ucs_search, ucs_multi_target, ucs_multi_source
+from dls import dls_search
+from iddfs import iddfs_search
+from bd import bidirectional_search
+from grid_graph import MOVES_6, MOVES_8
+from jps import jps_search
+
+SEARCHES = {
+    'bfs': bfs_search,
+    'dfs': dfs_search,
+    'ucs': ucs_search,
+    'dls': dls_search,       # needs limit=
+    'iddfs': iddfs_search,   # needs max_depth=
+    'bd': bidirectional_search,
+    'bd_ucs': bidirectional_ucs_search,
+    'jps': jps_search,       # 8-connected, uniform cost only
+}
+
+# Movement model of each search when no moves= option is given
+SEARCH_MOVES = {
+    'bfs': MOVES_6,
+    'dfs': MOVES_6,
+    'ucs': MOVES_8,
+    'dls': MOVES_6,
+    'iddfs': MOVES_6,
+    'bd': MOVES_6,
+    'bd_ucs': MOVES_8,
+    'jps': MOVES_8,
+}
+
+
+def find_path(grid, start, target, algorithm='bfs', components=None, **options):
+    # components is an optional components.ComponentIndex built for the same
+    # grid and movement model; pairs it proves unreachable return [] at once
+    if algorithm not in SEARCHES:
+        raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {sorted(SEARCHES)}")
+    if components is not None:
+        moves = options.get('moves', SEARCH_MOVES[algorithm])
+        if set(components.moves) != set(moves):
+            # Components of another movement model say nothing about this search
+            raise ValueError(f"components was built for other moves than {algorithm!r} uses, "
+                             f"build it with ComponentIndex(grid, moves)")
+        if components.reachable(start, target) is False:
+            return []
+    return SEARCHES[algorithm](grid, start, target, **options)
@@ -0,0 +1,164 @@
+# Counters and timers for the search cores.
+#
+# SearchStats is passed as the trace of any *_search function.  The cores
+# only call their trace hooks behind `if trace is not None`, so a search run
+# without one pays nothing for this; with one it counts
+#   expanded          cells taken off the frontier and expanded
+#   generated         frontier insertions
+#   duplicate_pushes  insertions of a cell that had been inserted before,
+#                     e.g. DFS stacking a cell twice or a UCS heap improvement
+#   max_frontier      the largest the frontier got, stale entries included
+#   re_expanded       expansions of a cell that had already been expanded
+#   limits            [limit, expanded, re_expanded] per IDDFS iteration
+#
+# With timers=True each expansion is also split at step(): from there to the
+# next pop the core scans the neighbours and pushes them, the rest is queue
+# and bookkeeping work.  The hooks themselves run inside both spans, so
+# compare the two between searches rather than with untraced runs.
+#
+# DLS, IDDFS and the bidirectional searches never push or pop, so summary()
+# reports cells visited as generated for them and None for the duplicate
+# pushes, the frontier size and the two timers.
+#
+# profile_search wraps a search with SearchStats and, optionally, cProfile
+# and tracemalloc.
+import time
+
+from grid_graph import Grid
+
+CURRENT_KEYS = ('current', 'current_f', 'current_b')
+
+
+class SearchStats:
+
+    def __init__(self, timers=False):
+        self.expanded = 0
+        self.generated = 0
+        self.visited = 0
+        self.duplicate_pushes = 0
+        self.frontier = 0
+        self.max_frontier = 0
+        self.re_expanded = 0
+        self.limits = []
+        self.neighbor_seconds = 0.0
+        self.bookkeeping_seconds = 0.0
+        self.timers = timers
+        self._pushed = set()
+        self._expanded_cells = set()
+        self._current = None
+        self._final = False
+        self._mark = None
+        self._scanning = False
+
+    def visit(self, cell, value=None, layer='visited'):
+        self.visited += 1
+
+    def reset(self, layer='visited'):
+        pass
+
+    def push(self, cell):
+        self.generated += 1
+        if cell in self._pushed:
+            self.duplicate_pushes += 1
+        else:
+            self._pushed.add(cell)
+        self.frontier += 1
+        if self.frontier > self.max_frontier:
+            self.max_frontier = self.frontier
+
+    def pop(self, cell):
+        self.frontier -= 1
+        if self.timers:
+            self._lap(False)
+
+    def clear_frontier(self):
+        self.frontier = 0
+
+    def note(self, key, value):
+        if key in CURRENT_KEYS:
+            if value is not None:
+                self._current = value
+        elif key == 'path':
+            self._final = True
+        elif key == 'limit':
+            self.limits.append([value, 0, 0])
+
+    def step(self):
+        if self._final:
+            # The last frame only shows the path
+            self._final = False
+            return
+        if self.timers:
+            self._lap(True)
+        self.expanded += 1
+        repeated = self._current in self._expanded_cells
+        if repeated:
+            self.re_expanded += 1
+        else:
+            self._expanded_cells.add(self._current)
+        if self.limits:
+            self.limits[-1][1] += 1
+            self.limits[-1][2] += repeated
+
+    def _lap(self, expanding):
+        # Charges the time since the last pop or step to the span it closes
+        now = time.perf_counter()
+        if self._mark is not None:
+            if self._scanning:
+                self.neighbor_seconds += now - self._mark
+            else:
+                self.bookkeeping_seconds += now - self._mark
+        self._mark = now
+        self._scanning = expanding
+
+    def summary(self):
+        report = {key: getattr(self, key) for key in
+                  ('expanded', 'generated', 'duplicate_pushes', 'max_frontier', 're_expanded')}
+        if self.limits:
+            report['limits'] = [tuple(entry) for entry in self.limits]
+        if self.timers:
+            report['neighbor_seconds'] = self.neighbor_seconds
+            report['bookkeeping_seconds'] = self.bookkeeping_seconds
+        if not self.generated:
+            # No frontier events, so only the visits say anything
+            report.update(generated=self.visited, duplicate_pushes=None, max_frontier=None)
+            if self.timers:
+                report.update(neighbor_seconds=None, bookkeeping_seconds=None)
+        return report
+
+
+def profile_search(search, grid, start, target, timers=False, profile=False, memory=False,
+                   **options):
+    # Runs search(grid, start, target, trace=SearchStats(timers), **options)
+    # and returns (path, report), the report being stats.summary() plus the
+    # wall time.  profile=True adds 'profile', a pstats.Stats of the run, and
+    # memory=True adds 'peak_bytes' from tracemalloc; both slow the search
+    # down, so don't read the wall time of such a run too closely.
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    grid = Grid.coerce(grid)
+    stats = SearchStats(timers)
+    profiler = cProfile.Profile() if profile else None
+    if memory:
+        tracemalloc.start()
+    began = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        path = search(grid, start, target, trace=stats, **options)
+    finally:
+        if profiler:
+            profiler.disable()
+        seconds = time.perf_counter() - began
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    report = stats.summary()
+    report['seconds'] = seconds
+    if memory:
+        report['peak_bytes'] = peak
+    if profiler:
+        report['profile'] = pstats.Stats(profiler)
+    return path, report
@@ -0,0 +1,296 @@
+# Delta-encoded recording of a search run.
+#
+# Instead of snapshotting the whole visited set for every expansion, a search
+# records small events (cell visited, pushed, popped, a note such as the current
+# cell or its cost) and calls step() whenever a frame should be shown.  Any
+# frame can be rebuilt on demand from the nearest keyframe, and sequential
+# playback only applies the events of the frames in between.
+#
+# StreamingTrace records the same events from a search running on a worker
+# thread, so playback can start with the first frame.  The search is held at
+# most lookahead frames ahead of the consumer, and cancel() stops it at its
+# next step().
+import threading
+from bisect import bisect_right
+
+VISIT, RESET, PUSH, POP, NOTE = range(5)
+
+
+class SearchTrace:
+    def __init__(self, keyframe_interval=256):
+        self.keyframe_interval = keyframe_interval
+        self._ops = bytearray()  # one opcode per event
+        self._args = []          # layer name, cell or (key, value) per event
+        self._step_ends = []     # number of events recorded when each frame was cut
+        self._logs = {}          # layer name -> list of (cell, value) in visit order
+        self._keyframes = []
+        self._key_steps = []     # frame index of each keyframe
+        self._key_ops = 0        # number of events recorded at the last keyframe
+        # Running summary of the latest frame, used to cut keyframes.
+        # Layers are only stored as (start, length) windows into their logs,
+        # so a keyframe costs O(frontier) instead of O(visited).
+        self._starts = {}
+        self._lengths = {}
+        self._frontier = {}
+        self._notes = {}
+
+    def __len__(self):
+        return len(self._step_ends)
+
+    # --- Recording ---
+
+    def visit(self, cell, value=None, layer='visited'):
+        log = self._logs.get(layer)
+        if log is None:
+            log = self._logs[layer] = []
+            self._starts[layer] = 0
+            self._lengths[layer] = 0
+        log.append((cell, value))
+        self._lengths[layer] += 1
+        self._ops.append(VISIT)
+        self._args.append(layer)
+
+    def reset(self, layer='visited'):
+        if layer not in self._logs:
+            return
+        self._starts[layer] = self._lengths[layer]
+        self._ops.append(RESET)
+        self._args.append(layer)
+
+    def push(self, cell):
+        self._frontier[cell] = self._frontier.get(cell, 0) + 1
+        self._ops.append(PUSH)
+        self._args.append(cell)
+
+    def pop(self, cell):
+        count = self._frontier[cell] - 1
+        if count:
+            self._frontier[cell] = count
+        else:
+            del self._frontier[cell]
+        self._ops.append(POP)
+        self._args.append(cell)
+
+    def clear_frontier(self):
+        for cell, count in list(self._frontier.items()):
+            for _ in range(count):
+                self.pop(cell)
+
+    def note(self, key, value):
+        self._notes[key] = value
+        self._ops.append(NOTE)
+        self._args.append((key, value))
+
+    def step(self):
+        step_idx = len(self._step_ends)
+        self._step_ends.append(len(self._ops))
+        # Keyframes are at least keyframe_interval frames apart, and are only
+        # cut once the events since the last one outnumber the frontier they
+        # copy, so keyframe storage never exceeds the event log itself
+        if self._key_steps and (step_idx - self._key_steps[-1] < self.keyframe_interval or
+                                len(self._ops) - self._key_ops < len(self._frontier)):
+            return
+        self._keyframes.append((dict(self._starts), dict(self._lengths),
+                                dict(self._frontier), dict(self._notes)))
+        self._key_steps.append(step_idx)
+        self._key_ops = len(self._ops)
+
+    # --- Playback ---
+
+    def note_steps(self, key):
+        # Returns (step_idx, value) for every frame in which the note key was
+        # set, with the last value set in that frame, without replaying states
+        ops, args, ends = self._ops, self._args, self._step_ends
+        steps = []
+        i = ops.find(NOTE)
+        while i >= 0:
+            note_key, value = args[i]
+            if note_key == key:
+                step_idx = bisect_right(ends, i)
+                if step_idx == len(ends):
+                    break
+                if steps and steps[-1][0] == step_idx:
+                    steps[-1] = (step_idx, value)
+                else:
+                    steps.append((step_idx, value))
+            i = ops.find(NOTE, i + 1)
+        return steps
+
+    def state_at(self, step_idx):
+        return TraceCursor(self).seek(step_idx)
+
+    def cursor(self):
+        return TraceCursor(self)
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class StreamingTrace(SearchTrace):
+
+    def __init__(self, lookahead=64, keyframe_interval=256):
+        super().__init__(keyframe_interval)
+        self.lookahead = lookahead
+        self.result = None
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self._consumed = 0
+        self._changed = threading.Condition()
+
+    def step(self):
+        with self._changed:
+            while not self.cancelled and len(self) - self._consumed >= self.lookahead:
+                self._changed.wait()
+            if self.cancelled:
+                raise SearchCancelled()
+            super().step()
+            self._changed.notify_all()
+
+    def cancel(self):
+        with self._changed:
+            self.cancelled = True
+            self._changed.notify_all()
+
+    def finish(self):
+        # Lifts the look-ahead bound and waits for the search to end
+        with self._changed:
+            self.lookahead = float('inf')
+            self._changed.notify_all()
+            while not self.done:
+                self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+    def frames(self):
+        # Yields frame indices as the search records them; closing the
+        # generator early cancels the search
+        step_idx = 0
+        try:
+            while True:
+                with self._changed:
+                    while step_idx >= len(self) and not self.done:
+                        self._changed.wait()
+                    if step_idx >= len(self):
+                        break
+                    self._consumed = step_idx + 1
+                    self._changed.notify_all()
+                yield step_idx
+                step_idx += 1
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.cancel()
+
+    def states(self):
+        cursor = self.cursor()
+        for step_idx in self.frames():
+            yield cursor.seek(step_idx)
+
+    def _run(self, search, args, options):
+        try:
+            self.result = search(*args, trace=self, **options)
+        except SearchCancelled:
+            pass
+        except Exception as error:
+            self.error = error
+        with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+
+def stream_search(search, *args, lookahead=64, **options):
+    # Starts search(*args, trace=..., **options) on a daemon thread and returns
+    # its StreamingTrace straight away
+    trace = StreamingTrace(lookahead)
+    threading.Thread(target=trace._run, args=(search, args, options), daemon=True).start()
+    return trace
+
+
+class TraceCursor:
+    # Walks a SearchTrace frame by frame.  Moving forward applies only the
+    # events in between; moving backwards reloads from the nearest keyframe.
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.position = -1
+        self.touched = set()
+
+    def _keyframe(self, step_idx):
+        # Index of the last keyframe at or before step_idx
+        return bisect_right(self.trace._key_steps, step_idx) - 1
+
+    def _load(self, step_idx):
+        trace = self.trace
+        key_idx = self._keyframe(step_idx)
+        starts, lengths, frontier, notes = trace._keyframes[key_idx]
+        self._starts = dict(starts)
+        self._lengths = dict(lengths)
+        self._frontier = dict(frontier)
+        self._frontier_size = sum(frontier.values())
+        self._notes = dict(notes)
+        self._layers = {name: dict(trace._logs[name][starts[name]:lengths[name]])
+                        for name in lengths}
+        self.position = trace._key_steps[key_idx]
+
+    def _advance(self, step_idx):
+        trace = self.trace
+        ops, args, logs = trace._ops, trace._args, trace._logs
+        lengths, starts, layers = self._lengths, self._starts, self._layers
+        frontier, touched = self._frontier, self.touched
+
+        for i in range(trace._step_ends[self.position], trace._step_ends[step_idx]):
+            op, arg = ops[i], args[i]
+            if op == VISIT:
+                if arg not in lengths:
+                    starts[arg] = lengths[arg] = 0
+                    layers[arg] = {}
+                cell, value = logs[arg][lengths[arg]]
+                lengths[arg] += 1
+                layers[arg][cell] = value
+                touched.add(cell)
+            elif op == RESET:
+                touched.update(layers[arg])
+                layers[arg] = {}
+                starts[arg] = lengths[arg]
+            elif op == PUSH:
+                frontier[arg] = frontier.get(arg, 0) + 1
+                self._frontier_size += 1
+                touched.add(arg)
+            elif op == POP:
+                count = frontier[arg] - 1
+                if count:
+                    frontier[arg] = count
+                else:
+                    del frontier[arg]
+                self._frontier_size -= 1
+                touched.add(arg)
+            else:
+                key, value = arg
+                self._notes[key] = value
+        self.position = step_idx
+
+    def seek(self, step_idx):
+        # Returns the full state of frame step_idx.  The cells whose layer or
+        # frontier membership changed since the previous seek are left in
+        # self.touched, which is None when the state was rebuilt from a keyframe.
+        rebuilt = (self.position < 0 or step_idx < self.position or
+                   (step_idx - self.position > self.trace.keyframe_interval and
+                    self.trace._key_steps[self._keyframe(step_idx)] > self.position))
+        self.touched = set()
+        if rebuilt:
+            self._load(step_idx)
+        if step_idx > self.position:
+            self._advance(step_idx)
+        if rebuilt:
+            self.touched = None
+        return self.state
+
+    @property
+    def state(self):
+        state = dict(self._notes)
+        state.update(self._layers)
+        state['frontier'] = self._frontier
+        state['frontier_size'] = self._frontier_size
+        return state
@@ -1,147 +1,447 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.animation import FuncAnimation
 import heapq
+from array import array
+from grid_graph import Grid, MOVES_8, reversed_moves
+from search_trace import SearchTrace, stream_search
+
+def terrain_costs(grid, costs=None):
+    # Flattens a per-cell cost grid (the cost of stepping onto each cell) into
+    # an array('i') for integer costs or array('d') otherwise.  Without costs,
+    # every step costs 1 as in the original demo grids.  A flat array('i') or
+    # array('d') of the right length is already in that form and is returned
+    # as it is, without a copy or the per-cell checks, so big maps can pass
+    # the same costs to many searches cheaply.
+    if costs is None:
+        return array('i', [1]) * len(grid)
+    if isinstance(costs, array) and costs.typecode in ('i', 'd') and len(costs) == len(grid):
+        return costs
+    flat = costs if len(costs) == len(grid) and not hasattr(costs[0], '__len__') else \
+        [value for row in costs for value in row]
+    if len(flat) != len(grid):
+        raise ValueError(f"costs has {len(flat)} cells, expected {len(grid)}")
+    if min(flat) < 0:
+        raise ValueError("UCS needs non-negative step costs")
+    if all(isinstance(value, int) for value in flat):
+        return array('i', flat)
+    return array('d', flat)
+
+def path_cost(grid, path, costs=None):
+    grid = Grid.coerce(grid)
+    step_costs = terrain_costs(grid, costs)
+    return sum(step_costs[grid.index(cell)] for cell in path[1:])
+
+def ucs_search(grid, start, target, trace=None, costs=None, queue='auto',
+               moves=MOVES_8, heuristic=None, weight=1):
+    # costs optionally gives the integer (or float) cost of entering each cell.
+    # Integer costs run on a bucket queue (Dial's algorithm); queue='heap'
+    # forces the binary-heap version, which is also used for float costs.
+    # Passing heuristic (a function of the cell id) turns this into A*, with
+    # f = g + weight * h; see astar.py.  queue='auto' then always picks the
+    # heap: the bucket queue only terminates for a consistent heuristic that
+    # returns integers, so callers that have one ask for queue='bucket'.
+    grid = Grid.coerce(grid)
+    step_costs = terrain_costs(grid, costs)
+    integral = step_costs.typecode == 'i' and weight == 1
+    if queue == 'auto':
+        queue = 'bucket' if integral and heuristic is None else 'heap'
+    if queue == 'bucket':
+        if not integral:
+            raise ValueError("The bucket queue needs integer costs and weight 1, use queue='heap'")
+        search = _ucs_buckets
+    elif queue == 'heap':
+        search = _ucs_heap
+    else:
+        raise ValueError(f"Unknown queue {queue!r}, expected 'auto', 'bucket' or 'heap'")
+    parent, goal_cost = search(grid, start, target, trace, step_costs, moves,
+                               heuristic, weight)
 
-def ucs_visualized(grid, start, target):
-    rows, cols = len(grid), len(grid[0])
-    # visited stores the minimum cost to reach a node
-    visited = {}
-    # priority_queue stores (cost, current_node)
-    priority_queue = [(0, start)]
-    parent = {start: None}
-    states = []
     final_path = []
+    if goal_cost is not None:
+        final_path = grid.parent_path(parent, grid.index(target))
+        
+        if trace is not None:
+            # Add a final state to show the path
+            trace.clear_frontier()
+            trace.note('current', target)
+            trace.note('path', final_path)
+            trace.step()
     
-    found = False
+    return final_path
+
+def _ucs_buckets(grid, start, target, trace, step_costs, moves, heuristic, weight):
+    cells = grid.cells
+    offsets, targets = grid.neighbors(moves)
+    source, goal = grid.index(start), grid.index(target)
+    # best stores the cheapest known cost to reach a node (-1 = not reached)
+    best = array('i', [-1]) * len(grid)
+    settled = bytearray(len(grid))
+    parent = array('i', [-1]) * len(grid)
+    # Dial's bucket queue, kept inline to keep method calls out of the hot
+    # loop: a dict of buckets keyed by absolute priority (g, or f = g + h for
+    # A* with a consistent integer heuristic), which never decreases.  Buckets
+    # are dicts too, so an improved cost moves its entry instead of leaving a
+    # stale duplicate behind.  A heuristic of inf proves the target cannot
+    # be reached from a cell, so such cells are closed without being queued.
+    # Entries below the cursor, or at a fractional priority it steps over,
+    # would never come out, so an inconsistent or non-integer heuristic
+    # raises instead of spinning.
+    h = heuristic if heuristic is not None else (lambda node: 0)
+    priority = top = h(source)
+    buckets = {priority: {source: None}}
+    best[source] = 0
+    queued = 1
+    if trace is not None:
+        trace.push(start)
+
+    while queued:
+        bucket = buckets.get(priority)
+        while not bucket:
+            buckets.pop(priority, None)
+            priority += 1
+            if priority > top:
+                raise ValueError("The bucket queue needs a heuristic that returns integers, "
+                                 "use queue='heap'")
+            bucket = buckets.get(priority)
+        node = bucket.popitem()[0]
+        queued -= 1
+        settled[node] = 1
+        cost = best[node]
+        if trace is not None:
+            trace.pop(grid.cell(node))
+            trace.visit(grid.cell(node), cost)
+
+            # Capture state for animation
+            trace.note('current', grid.cell(node))
+            trace.note('cost', cost)
+            trace.step()
+
+        if node == goal:
+            return parent, cost
+
+        for k in range(offsets[node], offsets[node + 1]):
+            nxt = targets[k]
+            if cells[nxt] or settled[nxt]:
+                continue
+            new_cost = cost + step_costs[nxt]
+            old_cost = best[nxt]
+            if old_cost < 0:
+                new_priority = new_cost + h(nxt) if heuristic is not None else new_cost
+                if new_priority < priority:
+                    raise ValueError("The bucket queue needs a consistent heuristic, use queue='heap'")
+                if new_priority > top:
+                    if new_priority == float('inf'):
+                        settled[nxt] = 1
+                        continue
+                    top = new_priority
+                best[nxt] = new_cost
+                parent[nxt] = node
+                bucket = buckets.get(new_priority)
+                if bucket is None:
+                    bucket = buckets[new_priority] = {}
+                bucket[nxt] = None
+                queued += 1
+                if trace is not None:
+                    trace.push(grid.cell(nxt))
+            elif new_cost < old_cost:
+                # Move the queued entry instead of pushing a stale duplicate
+                offset = h(nxt) if heuristic is not None else 0
+                if new_cost + offset < priority:
+                    raise ValueError("The bucket queue needs a consistent heuristic, use queue='heap'")
+                best[nxt] = new_cost
+                parent[nxt] = node
+                del buckets[old_cost + offset][nxt]
+                bucket = buckets.get(new_cost + offset)
+                if bucket is None:
+                    bucket = buckets[new_cost + offset] = {}
+                bucket[nxt] = None
+
+    return parent, None
+
+def _ucs_heap(grid, start, target, trace, step_costs, moves, heuristic, weight):
+    cells = grid.cells
+    offsets, targets = grid.neighbors(moves)
+    source, goal = grid.index(start), grid.index(target)
+    best = array('d', [float('inf')]) * len(grid)
+    settled = bytearray(len(grid))
+    parent = array('i', [-1]) * len(grid)
+    # priority_queue stores (priority, current_node), where the priority is the
+    # cost so far (plus weight * heuristic for A*); improvements push a new
+    # entry and the outdated one is skipped when it is popped
+    priority_queue = [(weight * heuristic(source) if heuristic is not None else 0, source)]
+    best[source] = 0
+    if trace is not None:
+        trace.push(start)
+
     while priority_queue:
-        cost, (r, c) = heapq.heappop(priority_queue)
-        
-        if (r, c) in visited and visited[(r, c)] <= cost:
+        node = heapq.heappop(priority_queue)[1]
+        if trace is not None:
+            trace.pop(grid.cell(node))
+
+        if settled[node]:
             continue
-            
-        visited[(r, c)] = cost
-        
-        # Capture state for animation
-        states.append({
-            'current': (r, c),
-            'visited': visited.copy(),
-            'queue': list(priority_queue),
-            'cost': cost,
-            'path': []
-        })
-
-        if (r, c) == target:
-            found = True
+
+        settled[node] = 1
+        cost = best[node]
+        if step_costs.typecode == 'i':
+            cost = int(cost)
+        if trace is not None:
+            trace.visit(grid.cell(node), cost)
+
+            # Capture state for animation
+            trace.note('current', grid.cell(node))
+            trace.note('cost', cost)
+            trace.step()
+
+        if node == goal:
+            return parent, cost
+
+        for k in range(offsets[node], offsets[node + 1]):
+            nxt = targets[k]
+            if cells[nxt] or settled[nxt]:
+                continue
+            new_cost = cost + step_costs[nxt]
+            if new_cost < best[nxt]:
+                best[nxt] = new_cost
+                parent[nxt] = node
+                if heuristic is not None:
+                    heapq.heappush(priority_queue, (new_cost + weight * heuristic(nxt), nxt))
+                else:
+                    heapq.heappush(priority_queue, (new_cost, nxt))
+                if trace is not None:
+                    trace.push(grid.cell(nxt))
+
+    return parent, None
+
+def bidirectional_ucs_search(grid, start, target, trace=None, costs=None, moves=MOVES_8):
+    # Dijkstra from both ends on binary heaps.  Costs are paid on entering a
+    # cell, so the backward side walks the reversed moves and pays for the cell
+    # it steps off.  mu is the cheapest start-target path seen so far; once the
+    # two queue minimums add up to at least mu no cheaper path can be left.
+    grid = Grid.coerce(grid)
+    cells = grid.cells
+    step_costs = terrain_costs(grid, costs)
+    source, goal = grid.index(start), grid.index(target)
+    tables = (grid.neighbors(moves), grid.neighbors(reversed_moves(moves)))
+    best = (array('d', [float('inf')]) * len(grid), array('d', [float('inf')]) * len(grid))
+    settled = (bytearray(len(grid)), bytearray(len(grid)))
+    parent = (array('i', [-1]) * len(grid), array('i', [-1]) * len(grid))
+    queues = ([(0, source)], [(0, goal)])
+    best[0][source] = 0
+    best[1][goal] = 0
+    layers = ('forward_visited', 'backward_visited')
+    current_keys = ('current_f', 'current_b')
+    integral = step_costs.typecode == 'i'
+
+    # mu and the cell where the forward and backward paths for it join
+    mu, meet = (0, source) if source == goal else (float('inf'), -1)
+    if trace is not None:
+        trace.note('current_f', None)
+        trace.note('current_b', None)
+        trace.note('intersect', None)
+        trace.note('cost', None)
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= mu:
             break
-            
-        # Directions: Up, Right, Down, Left, and 4 diagonals
-        directions = [(-1, 0), (0, 1), (1, 0), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)]
-        
-        for dr, dc in directions:
-            nr, nc = r + dr, c + dc
-            if (0 <= nr < rows and 0 <= nc < cols and grid[nr][nc] != 1):
-                # In this grid, each step has a cost of 1
-                new_cost = cost + 1
-                if (nr, nc) not in visited or new_cost < visited[(nr, nc)]:
-                    parent[(nr, nc)] = (r, c)
-                    heapq.heappush(priority_queue, (new_cost, (nr, nc)))
-    
-    if found:
-        curr = target
-        while curr is not None:
-            final_path.append(curr)
-            curr = parent.get(curr)
-        final_path.reverse()
-        
-        # Add a final state to show the path
-        states.append({
-            'current': target,
-            'visited': visited,
-            'queue': [],
-            'cost': cost,
-            'path': final_path
-        })
-    
-    return states
 
-def visualize_ucs(grid, start, target):
-    states = ucs_visualized(grid, start, target)
-    rows, cols = len(grid), len(grid[0])
-    
-    fig, ax = plt.subplots(figsize=(14, 8))
-    plt.subplots_adjust(right=0.7) 
-
-    def draw_grid(state_idx):
-        ax.clear()
-        active_idx = min(state_idx, len(states) - 1)
-        curr_state = states[active_idx]
-        path_cells = curr_state.get('path', [])
-        in_queue = [pos for cost, pos in curr_state['queue']]
-
-        for i in range(rows):
-            for j in range(cols):
-                if grid[i][j] == 1: color = 'black'
-                elif (i, j) == start: color = 'green'
-                elif (i, j) == target: color = 'orange'
-                elif (i, j) in path_cells: color = 'magenta'
-                elif (i, j) == curr_state['current']: color = 'red'
-                elif (i, j) in in_queue: color = 'yellow'
-                elif (i, j) in curr_state['visited']: color = 'lightblue'
-                else: color = 'white'
-                
-                rect = patches.Rectangle((j - 0.5, i - 0.5), 1, 1,
-                                         linewidth=1, edgecolor='gray', facecolor=color)
-                ax.add_patch(rect)
-                
-                label = f'({i},{j})'
-                if (i, j) in curr_state['visited']:
-                    label += f'\nC:{curr_state["visited"][(i,j)]}'
-                ax.text(j, i, label, ha='center', va='center', fontsize=7, color='darkgray')
-
-        if path_cells:
-            py, px = zip(*path_cells)
-            ax.plot(px, py, color='white', linewidth=3, alpha=0.8)
-
-        ax.set_xticks(range(cols))
-        ax.set_yticks(range(rows))
-        ax.set_xlim(-0.5, cols - 0.5)
-        ax.set_ylim(-0.5, rows - 0.5)
-        ax.invert_yaxis()
-        ax.set_aspect('equal')
-        
-        if path_cells:
-            status_text = f"--- UCS SUCCESS ---\n\nPath Found!\nTotal Cost: {curr_state['cost']}"
-        elif state_idx < len(states):
-            status_text = (f"--- UCS STATUS ---\n\nStep: {state_idx + 1}\n"
-                           f"Current Cost: {curr_state['cost']}\n"
-                           f"Queue Size: {len(curr_state['queue'])}")
-        else:
-            status_text = "--- UCS COMPLETE ---\n\nNo Path Found"
-
-        ax.text(cols + 0.3, rows // 2, status_text, fontsize=13, fontweight='bold', 
-                va='center', bbox=dict(facecolor='white', alpha=0.8, edgecolor='black'))
-        
-        legend_elements = [
-            patches.Patch(facecolor='green', label='Start'),
-            patches.Patch(facecolor='orange', label='Target'),
-            patches.Patch(facecolor='magenta', label='Final Path'),
-            patches.Patch(facecolor='red', label='Current'),
-            patches.Patch(facecolor='yellow', label='In Priority Queue'),
-            patches.Patch(facecolor='lightblue', label='Visited'),
-            patches.Patch(facecolor='black', label='Obstacle')
-        ]
-        ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.05, 1))
-
-    ani = FuncAnimation(fig, draw_grid, frames=len(states), interval=300, repeat=False)
-    plt.show()
-
-grid = [
-    [0, 0, 0, 0, 0],
-    [0, 1, 1, 0, 0],
-    [0, 0, 0, 0, 0],
-    [0, 0, 1, 1, 0],
-    [0, 0, 0, 0, 0]
-]
-
-visualize_ucs(grid, (0, 0), (4, 4))
\ No newline at end of file
+        # Settle the cheaper of the two queue heads
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        queue, dist, other = queues[side], best[side], best[1 - side]
+        node = heapq.heappop(queue)[1]
+        if settled[side][node]:
+            continue
+
+        settled[side][node] = 1
+        cost = dist[node]
+        if trace is not None:
+            trace.visit(grid.cell(node), int(cost) if integral else cost, layers[side])
+            trace.note(current_keys[side], grid.cell(node))
+            trace.note(current_keys[1 - side], None)
+            trace.step()
+
+        offsets, targets = tables[side]
+        for k in range(offsets[node], offsets[node + 1]):
+            nxt = targets[k]
+            if cells[nxt] or settled[side][nxt]:
+                continue
+            new_cost = cost + (step_costs[node] if side else step_costs[nxt])
+            if new_cost < dist[nxt]:
+                dist[nxt] = new_cost
+                parent[side][nxt] = node
+                heapq.heappush(queue, (new_cost, nxt))
+                if new_cost + other[nxt] < mu:
+                    mu, meet = new_cost + other[nxt], nxt
+                    if trace is not None:
+                        trace.note('intersect', grid.cell(meet))
+                        trace.note('cost', int(mu) if integral else mu)
+
+    final_path = []
+    if meet >= 0:
+        # Forward half up to the meeting cell, then the backward parents on to the target
+        final_path = grid.parent_path(parent[0], meet)
+        path_b = grid.parent_path(parent[1], parent[1][meet])
+        path_b.reverse()
+        final_path += path_b
+
+        if trace is not None:
+            trace.note('current_f', None)
+            trace.note('current_b', None)
+            trace.note('intersect', grid.cell(meet))
+            trace.note('cost', int(mu) if integral else mu)
+            trace.note('path', final_path)
+            trace.step()
+
+    return final_path
+
+def _ucs_tree(grid, sources, step_costs, moves, goals=None, k=0, trace=None, towards=False):
+    # Heap-based Dijkstra seeded with every source id at cost 0.  Returns
+    # (best, nearest, parent, settled) arrays over cell ids; best is array('d')
+    # with inf for unreachable cells and nearest indexes sources (-1 = unreachable).
+    # With goals (a set of ids) it stops once k of them have been settled.
+    # towards=True walks the reversed moves and pays for the cell being left,
+    # giving the cost from every cell to its nearest source instead.  Wall
+    # sources are skipped and stay unreachable.
+    cells = grid.cells
+    offsets, targets = grid.neighbors(reversed_moves(moves) if towards else moves)
+    best = array('d', [float('inf')]) * len(grid)
+    settled = bytearray(len(grid))
+    nearest = array('i', [-1]) * len(grid)
+    parent = array('i', [-1]) * len(grid)
+    priority_queue = []
+    for i, source in enumerate(sources):
+        if nearest[source] < 0 and not cells[source]:
+            best[source] = 0
+            nearest[source] = i
+            priority_queue.append((0, source))
+            if trace is not None:
+                trace.push(grid.cell(source))
+
+    while priority_queue:
+        cost, node = heapq.heappop(priority_queue)
+        if trace is not None:
+            trace.pop(grid.cell(node))
+
+        if settled[node]:
+            continue
+
+        settled[node] = 1
+        if trace is not None:
+            trace.visit(grid.cell(node), cost)
+            trace.note('current', grid.cell(node))
+            trace.note('cost', cost)
+            trace.step()
+
+        if goals is not None and node in goals:
+            k -= 1
+            if trace is not None:
+                trace.visit(grid.cell(node), cost, layer='reached')
+            if not k:
+                break
+
+        for j in range(offsets[node], offsets[node + 1]):
+            nxt = targets[j]
+            if cells[nxt] or settled[nxt]:
+                continue
+            new_cost = cost + (step_costs[node] if towards else step_costs[nxt])
+            if new_cost < best[nxt]:
+                best[nxt] = new_cost
+                nearest[nxt] = nearest[node]
+                parent[nxt] = node
+                heapq.heappush(priority_queue, (new_cost, nxt))
+                if trace is not None:
+                    trace.push(grid.cell(nxt))
+
+    return best, nearest, parent, settled
+
+def ucs_multi_target(grid, start, targets, k=None, trace=None, costs=None, moves=MOVES_8):
+    # One expansion from start towards many targets.  Returns {target: path}
+    # for the targets settled, stopping once all of them (or the k cheapest)
+    # have been settled.
+    grid = Grid.coerce(grid)
+    goals = {grid.index(target) for target in targets}
+    k = len(goals) if k is None else min(k, len(goals))
+    if not k:
+        return {}
+    best, nearest, parent, settled = _ucs_tree(grid, [grid.index(start)], terrain_costs(grid, costs),
+                                               moves, goals, k, trace)
+    # Targets still queued when the search stopped may not have their final cost
+    return {tuple(target): grid.parent_path(parent, grid.index(target))
+            for target in targets if settled[grid.index(target)]}
+
+def ucs_multi_source(grid, sources, trace=None, costs=None, moves=MOVES_8, towards=False):
+    # Expands from all sources at once and returns the (best, nearest, parent)
+    # arrays described in _ucs_tree.  grid.parent_path(parent, idx) gives the
+    # cheapest path from the nearest source to cell idx; with towards=True it
+    # is the path from idx to its nearest source, reversed.
+    grid = Grid.coerce(grid)
+    best, nearest, parent, settled = _ucs_tree(grid, [grid.index(source) for source in sources],
+                                               terrain_costs(grid, costs), moves,
+                                               trace=trace, towards=towards)
+    return best, nearest, parent
+
+def ucs_visualized(grid, start, target, costs=None):
+    trace = SearchTrace()
+    ucs_search(grid, start, target, trace, costs)
+    return trace
+
+def visualize_ucs(grid, start, target, costs=None, out=None, frames=None):
+    trace = stream_search(ucs_search, grid, start, target, costs=costs)
+    animate_ucs_trace(grid, trace, start, target, out=out, frames=frames)
+
+def animate_ucs_trace(grid, trace, start, target, name='UCS', out=None, frames=None):
+    # Shared by visualize_ucs and the A* visualizer in astar.py
+    import matplotlib.pyplot as plt
+    from grid_renderer import animate_trace
+
+    def cell_label(cell, curr_state):
+        label = f'({cell[0]},{cell[1]})'
+        if cell in curr_state['visited']:
+            label += f'\nC:{curr_state["visited"][cell]}'
+        return label
+
+    def status(state_idx, curr_state):
+        if curr_state.get('path'):
+            return f"--- {name} SUCCESS ---\n\nPath Found!\nTotal Cost: {curr_state['cost']}"
+        elif state_idx < len(trace):
+            return (f"--- {name} STATUS ---\n\nStep: {state_idx + 1}\n"
+                    f"Current Cost: {curr_state['cost']}\n"
+                    f"Queue Size: {curr_state['frontier_size']}")
+        return f"--- {name} COMPLETE ---\n\nNo Path Found"
+
+    legend_elements = [
+        ('green', 'Start'),
+        ('orange', 'Target'),
+        ('magenta', 'Final Path'),
+        ('red', 'Current'),
+        ('yellow', 'In Priority Queue'),
+        ('lightblue', 'Visited'),
+        ('black', 'Obstacle')
+    ]
+
+    ani = animate_trace(grid, trace, start, target, legend_elements, status,
+                        cell_label=cell_label, label_size=7, interval=300, out=out,
+                        frames=frames)
+    if out is None:
+        plt.show()
+
+def bidirectional_ucs_visualized(grid, start, target, costs=None, moves=MOVES_8):
+    trace = SearchTrace()
+    bidirectional_ucs_search(grid, start, target, trace, costs, moves)
+    return trace
+
+def visualize_bidirectional_ucs(grid, start, target, costs=None, moves=MOVES_8, out=None,
+                                frames=None):
+    from bd import animate_bidirectional_trace
+
+    trace = stream_search(bidirectional_ucs_search, grid, start, target, costs=costs, moves=moves)
+    animate_bidirectional_trace(grid, trace, start, target, out, frames)
+
+if __name__ == '__main__':
+    grid = [
+        [0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0],
+        [0, 0, 0, 0, 0],
+        [0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0]
+    ]
+
+    visualize_ucs(grid, (0, 0), (4, 4))
@@ -0,0 +1,56 @@
+# Whole-grid BFS distance fields computed one wavefront level at a time with NumPy.
+#
+# Every level shifts the current frontier by each move offset at once instead
+# of expanding one cell at a time, so the Python overhead is per level rather
+# than per cell.  Useful for flow fields, where the distance from one source
+# to every cell is needed.
+import numpy as np
+from grid_graph import Grid, MOVES_6
+
+
+def bfs_distance_field(grid, source, moves=MOVES_6):
+    # Returns (distance, parent_dir) as (rows, cols) arrays.  distance is int32
+    # with -1 for unreachable cells; parent_dir is the index into moves of the
+    # step that first reached each cell (-1 for the source and unreachable cells).
+    grid = Grid.coerce(grid)
+    rows, cols = grid.rows, grid.cols
+    free = np.frombuffer(grid.cells, dtype=np.uint8) == 0
+    distance = np.full(rows * cols, -1, dtype=np.int32)
+    parent_dir = np.full(rows * cols, -1, dtype=np.int8)
+
+    start = grid.index(source)
+    distance[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        level += 1
+        frontier_r, frontier_c = np.divmod(frontier, cols)
+        reached = []
+        # Each cell newly reached this level takes the lowest move index that
+        # reaches it from anywhere in the frontier, so parent_dir gives a
+        # shortest path but not necessarily the one bfs_search returns
+        for k, (dr, dc) in enumerate(moves):
+            nr, nc = frontier_r + dr, frontier_c + dc
+            inside = (nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)
+            nxt = nr[inside] * cols + nc[inside]
+            nxt = nxt[free[nxt] & (distance[nxt] < 0)]
+            distance[nxt] = level
+            parent_dir[nxt] = k
+            reached.append(nxt)
+        frontier = np.concatenate(reached)
+
+    return distance.reshape(rows, cols), parent_dir.reshape(rows, cols)
+
+
+def distance_field_path(parent_dir, source, target, moves=MOVES_6):
+    # Walks parent_dir back from target; returns [] when target was not reached
+    r, c = target
+    if (r, c) != tuple(source) and parent_dir[r, c] < 0:
+        return []
+    path = [(r, c)]
+    while (r, c) != tuple(source):
+        dr, dc = moves[parent_dir[r, c]]
+        r, c = r - dr, c - dc
+        path.append((r, c))
+    path.reverse()
+    return path